@@ -0,0 +1,312 @@
+"""
+Benchmarks of the framework's own overhead, driven by the offline ScriptedBackend.
+
+Usage:
+    python -m benchmarks.run [--output results.json] [--repeat 5] [--only react crew ...]
+
+Every benchmark reports the median wall-clock time of `--repeat` runs, as JSON, so results
+can be compared between releases. The run exits with status 1 if importing an agent module
+(or defining a crew) loaded one of HEAVY_MODULES, which must stay lazy.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from src.multiagent_systen.agent import Agent
+from src.multiagent_systen.crew import Crew
+from src.planning_agent.react_agent import REACT_TAGS, ReactAgent
+from src.reflection_pattern.reflection_agent import ReflectAgent
+from src.tool_agent.tool import tool
+from src.tool_agent.tool_agent import ToolAgent
+from src.utils.backends import ScriptedBackend
+from src.utils.cassette import Cassette
+from src.utils.completions import ChatHistory, struct_the_prompt
+from src.utils.telemetry import InMemoryCollector, tracer
+
+HEAVY_MODULES = ("groq", "dotenv", "colorama", "graphviz")
+IMPORT_TARGETS = (
+    "src.planning_agent.react_agent",
+    "src.tool_agent.tool_agent",
+    "src.reflection_pattern.reflection_agent",
+    "src.multiagent_systen.agent",
+)
+TOOL_CALL = '<thought>Adding</thought><tool_call>{"name": "add", "arguments": {"a": 1, "b": 2}, "id": 0}</tool_call>'
+
+
+@tool
+def add(a: int, b: int) -> int:
+    """Adds two integers and returns the result."""
+    return a + b
+
+
+def _measure(fn, repeat: int) -> float:
+    """Returns the median duration of `repeat` calls of `fn`, with agent logging silenced."""
+    durations = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def _react_script(turns: int):
+    def script(messages, model):
+        # Two pinned messages, then a thought and an observation per finished turn
+        return TOOL_CALL if (len(messages) - 2) // 2 < turns - 1 else "<response>3</response>"
+    return script
+
+
+def bench_react(repeat: int) -> list[dict]:
+    """Per-turn overhead of ReactAgent.run (one tool call per turn), with and without streaming."""
+    results = []
+    for turns in (1, 5, 19):
+        for stream in (False, True):
+            agent = ReactAgent([add], backend=ScriptedBackend(_react_script(turns)), stream=stream)
+            seconds = _measure(lambda: agent.run("What is 1 + 2?"), repeat)
+            results.append({
+                "name": "react_agent_run",
+                "params": {"turns": turns, "stream": stream},
+                "seconds": seconds,
+                "seconds_per_turn": seconds / turns,
+            })
+    return results
+
+
+def bench_tool_agent(repeat: int) -> list[dict]:
+    """Overhead of one ToolAgent.run: two completions and one tool call."""
+    agent = ToolAgent([add], backend=ScriptedBackend([TOOL_CALL, "3"]))
+    seconds = _measure(lambda: agent.run("What is 1 + 2?"), repeat)
+    return [{"name": "tool_agent_run", "params": {}, "seconds": seconds}]
+
+
+def bench_reflect(repeat: int) -> list[dict]:
+    """Overhead of ReflectAgent.run for a number of generate / critique steps."""
+    results = []
+    for n_steps in (1, 10):
+        agent = ReflectAgent(backend=ScriptedBackend(["A draft.", "Make it better."]))
+        seconds = _measure(lambda: agent.run("Write a haiku", n_steps=n_steps), repeat)
+        results.append({
+            "name": "reflect_agent_run",
+            "params": {"n_steps": n_steps},
+            "seconds": seconds,
+            "seconds_per_step": seconds / n_steps,
+        })
+    return results
+
+
+def bench_history(repeat: int) -> list[dict]:
+    """Cost of appending to a bounded ChatHistory as the number of turns grows."""
+    results = []
+    observation = struct_the_prompt("user", "observation " * 50, "observation")
+    for turns in (100, 1_000, 10_000):
+        for budget in (None, 4_000):
+            def fill():
+                history = ChatHistory([struct_the_prompt("system", "prompt")], max_length=50, pinned=1, max_tokens=budget)
+                for _ in range(turns):
+                    history.append(observation)
+            seconds = _measure(fill, repeat)
+            results.append({
+                "name": "chat_history_append",
+                "params": {"turns": turns, "max_tokens": budget},
+                "seconds": seconds,
+                "seconds_per_append": seconds / turns,
+            })
+    return results
+
+
+def bench_extraction(repeat: int) -> list[dict]:
+    """Cost of extracting the ReAct tags, in one pass and streamed, as the completion grows."""
+    results = []
+    for size in (1_000, 100_000, 1_000_000):
+        text = TOOL_CALL + "<thought>" + "x" * size + "</thought>"
+        seconds = _measure(lambda: REACT_TAGS.extract(text), repeat)
+        results.append({"name": "tag_extract", "params": {"chars": len(text)}, "seconds": seconds})
+
+        def stream():
+            parser = REACT_TAGS.stream()
+            for start in range(0, len(text), 16):
+                parser.feed(text[start:start + 16])
+        seconds = _measure(stream, repeat)
+        results.append({"name": "tag_stream_feed", "params": {"chars": len(text), "chunk_chars": 16}, "seconds": seconds})
+    return results
+
+
+def bench_crew(repeat: int) -> list[dict]:
+    """Crew throughput for layered DAGs of growing width and depth, with a simulated 10 ms LLM latency."""
+    results = []
+    latency = 0.01
+    for width in (1, 4, 16):
+        for depth in (1, 4):
+            def run_crew():
+                with Crew() as crew:
+                    previous = []
+                    for layer in range(depth):
+                        current = [
+                            Agent(
+                                name=f"agent_{layer}_{index}",
+                                backstory="You are a benchmark agent.",
+                                task_description="Answer briefly.",
+                                backend=ScriptedBackend(["<response>ok</response>"], latency=latency),
+                            )
+                            for index in range(width)
+                        ]
+                        for upstream in previous:
+                            upstream >> current
+                        previous = current
+                crew.run(max_workers=width)
+            seconds = _measure(run_crew, repeat)
+            results.append({
+                "name": "crew_run",
+                "params": {"width": width, "depth": depth, "llm_latency": latency},
+                "seconds": seconds,
+                "agents_per_second": width * depth / seconds,
+                "overhead_seconds": seconds - depth * latency,
+            })
+    return results
+
+
+def bench_telemetry(repeat: int) -> list[dict]:
+    """Overhead of tracing on a five-turn ReactAgent.run, disabled and collecting in memory."""
+    results = []
+    agent = ReactAgent([add], backend=ScriptedBackend(_react_script(5)))
+    for enabled in (False, True):
+        collector = tracer.add_exporter(InMemoryCollector()) if enabled else None
+        try:
+            seconds = _measure(lambda: agent.run("What is 1 + 2?"), repeat)
+        finally:
+            if collector is not None:
+                tracer.remove_exporter(collector)
+        results.append({"name": "react_agent_run_traced", "params": {"tracing": enabled}, "seconds": seconds})
+    return results
+
+
+def bench_replay(repeat: int) -> list[dict]:
+    """Replay of a recorded five-turn ReactAgent.run (20 ms simulated latency per call) against the live run."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "react.jsonl")
+        live = ReactAgent([add], backend=ScriptedBackend(_react_script(5), latency=0.02))
+        with contextlib.redirect_stdout(io.StringIO()), Cassette(path, mode="record"):
+            live.run("What is 1 + 2?")
+        results.append({"name": "react_agent_run_live", "params": {}, "seconds": _measure(lambda: live.run("What is 1 + 2?"), repeat)})
+
+        # The replaying agent's backend is never called
+        replayed = ReactAgent([add], backend=ScriptedBackend(["unused"]))
+
+        def replay():
+            with Cassette(path, strict=True):
+                replayed.run("What is 1 + 2?")
+
+        results.append({"name": "react_agent_run_replayed", "params": {}, "seconds": _measure(replay, repeat)})
+    return results
+
+
+def bench_import(repeat: int) -> list[dict]:
+    """
+    Cold import time of each agent module, and of defining a crew, in a fresh interpreter.
+
+    Each result lists the HEAVY_MODULES found in sys.modules afterwards; see `import_regressions`.
+    """
+    results = []
+    cases = [(module, f"import {module}") for module in IMPORT_TARGETS]
+    # Defining agents must not build their ReactAgent or an LLM client
+    cases.append((
+        "crew_definition",
+        "from src.multiagent_systen.agent import Agent\n"
+        "from src.multiagent_systen.crew import Crew\n"
+        "with Crew():\n"
+        "    [Agent(f'agent_{i}', 'backstory', 'task') for i in range(50)]",
+    ))
+    probe = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "{code}\n"
+        "seconds = time.perf_counter() - start\n"
+        "print(seconds, ','.join(m for m in {heavy!r} if m in sys.modules))"
+    )
+    for name, code in cases:
+        durations, loaded = [], ""
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", probe.format(code=code, heavy=HEAVY_MODULES)],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()
+            durations.append(float(output[0]))
+            loaded = output[1] if len(output) > 1 else ""
+        results.append({
+            "name": "cold_import",
+            "params": {"target": name},
+            "seconds": statistics.median(durations),
+            "heavy_modules_loaded": loaded.split(",") if loaded else [],
+        })
+    return results
+
+
+def import_regressions(results: list[dict]) -> list[str]:
+    """Describes the cold imports that loaded a heavy module eagerly."""
+    return [
+        f"{result['params']['target']} loaded {', '.join(result['heavy_modules_loaded'])}"
+        for result in results
+        if result.get("heavy_modules_loaded")
+    ]
+
+
+BENCHMARKS = {
+    "react": bench_react,
+    "tool": bench_tool_agent,
+    "reflect": bench_reflect,
+    "history": bench_history,
+    "extraction": bench_extraction,
+    "crew": bench_crew,
+    "telemetry": bench_telemetry,
+    "replay": bench_replay,
+    "import": bench_import,
+}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark the agent framework against a simulated LLM.")
+    parser.add_argument("--output", help="File to write the JSON results to (defaults to stdout).")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the median is reported.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (defaults to all).")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.extend(BENCHMARKS[name](args.repeat))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(payload)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    regressions = import_regressions(main()["results"])
+    if regressions:
+        print("Heavy modules imported eagerly:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
@@ -1,7 +1,28 @@
 from textwrap import dedent
+from typing import Callable
 from src.planning_agent.react_agent import ReactAgent
 from src.multiagent_systen.crew import Crew
 from src.tool_agent.tool import Tool
+from src.utils.backends import LLMBackend
+from src.utils.cache import ResponseCache, make_cache_key
+from src.utils.completions import struct_the_prompt
+from src.utils.prompts import PromptLayout
+from src.utils.async_runner import run_sync
+from src.utils.telemetry import agent_scope, tracer
+
+AGENT_INSTRUCTIONS = dedent(
+    """
+    You are an AI agent. You are part of a team of agents working together to complete a task.
+    I'm going to give you the task description enclosed in <task_description></task_description> tags. I'll also give
+    you the available context from the other agents in <context></context> tags, after the task. If the context
+    is not available, the <context></context> tags will be empty. You'll also receive the task
+    expected output enclosed in <task_expected_output></task_expected_output> tags. With all this information
+    you need to create the best possible response, always respecting the format as described in
+    <task_expected_output></task_expected_output> tags. If expected output is not available, just create
+    a meaningful response to complete the task.
+    """
+).strip()
+
 
 class Agent:
     def __init__(
@@ -12,6 +33,11 @@ class Agent:
         task_expected_output: str = "",
         tools: list[Tool] | None = None,
         llm: str = "llama-3.3-70b-versatile",
+        cache: ResponseCache | None = None,
+        max_history_tokens: int | None = None,
+        backend: LLMBackend | None = None,
+        section_delimiter: str | None = None,
+        max_observation_chars: int | None = None,
     ) -> None:
         self.name = name
         self.backstory = backstory
@@ -21,12 +47,40 @@ class Agent:
         self.model = llm
         self.dependencies: list[Agent] = []  # Agents this agent depends on
         self.dependents: list[Agent] = []  # Agents depending on this agent
-        self.context = ""  # Corrected spelling
+        self.context_segments: list[str] = []  # Context received from other agents, one segment each
+        # In a pipelined crew, process upstream outputs section by section (e.g. "\n\n" for paragraphs)
+        self.section_delimiter = section_delimiter
+        self._layout = None
+        self._layout_key = None
         if self.tools is None:
             self.tools = []
-        self.react_agent = ReactAgent(tools=self.tools, model=self.model, system_prompt=self.backstory)
+        self.cache = cache
+        self.max_history_tokens = max_history_tokens
+        self.backend = backend
+        self.max_observation_chars = max_observation_chars  # Larger tool results are spilled to disk
+        self._react_agent = None  # Built on the first run
         Crew.register_agent(self)  # Register agent in the crew
 
+    @property
+    def react_agent(self) -> ReactAgent:
+        """
+        The ReactAgent running the task, built on first use.
+
+        Agents that are only defined, restored from a checkpoint or sent to a worker process
+        never build one, nor the LLM client behind it.
+        """
+        if self._react_agent is None:
+            self._react_agent = ReactAgent(
+                tools=self.tools,
+                model=self.model,
+                system_prompt=self.backstory,
+                cache=self.cache,
+                max_history_tokens=self.max_history_tokens,
+                backend=self.backend,
+                max_observation_chars=self.max_observation_chars,
+            )
+        return self._react_agent
+
     def __str__(self):
         return self.name
 
@@ -101,6 +155,15 @@ class Agent:
         else:
             raise TypeError("The dependent must be an instance or list of Agent.")
 
+    @property
+    def context(self) -> str:
+        """The context received from other agents, joined only when the prompt is built."""
+        return "".join(self.context_segments)
+
+    @context.setter
+    def context(self, value: str) -> None:
+        self.context_segments = [value] if value else []
+
     def receive_context(self, input_data: str):
         """
         Receives and stores context information from other agents.
@@ -108,55 +171,85 @@ class Agent:
         Args:
             input_data (str): The context information to be added.
         """
-        self.context += f"{self.name} received context:\n{input_data}\n"
+        self.context_segments.append(f"{self.name} received context:\n{input_data}\n")
+
+    def _prompt_layout(self) -> PromptLayout:
+        # Rebuilt only when the task is edited, so the prefix stays byte-identical between runs
+        key = (self.task_description, self.task_expected_output)
+        if self._layout_key != key:
+            self._layout = PromptLayout(
+                AGENT_INSTRUCTIONS,
+                f"<task_description>\n{self.task_description}\n</task_description>",
+                f"<task_expected_output>\n{self.task_expected_output}\n</task_expected_output>",
+            )
+            self._layout_key = key
+        return self._layout
 
     def create_prompt(self) -> str:
         """
         Creates a prompt for the agent based on its task description, expected output, and context.
 
+        The instructions and the task come first and are the same on every run; the context
+        received from other agents comes last, so providers can cache the prompt prefix.
+
         Returns:
             str: The formatted prompt string.
         """
-        prompt = dedent(
-            f"""
-            You are an AI agent. You are part of a team of agents working together to complete a task.
-            I'm going to give you the task description enclosed in <task_description></task_description> tags. I'll also give
-            you the available context from the other agents in <context></context> tags. If the context
-            is not available, the <context></context> tags will be empty. You'll also receive the task
-            expected output enclosed in <task_expected_output></task_expected_output> tags. With all this information
-            you need to create the best possible response, always respecting the format as described in
-            <task_expected_output></task_expected_output> tags. If expected output is not available, just create
-            a meaningful response to complete the task.
+        return self._prompt_layout().render(f"<context>\n{self.context}\n</context>", "Your response:")
 
-            <task_description>
-            {self.task_description}
-            </task_description>
+    def checkpoint_key(self) -> str:
+        """
+        Hashes everything the agent's output depends on: model, backstory, tools and the prompt,
+        which holds the task, the expected output and the upstream outputs received as context.
 
-            <task_expected_output>
-            {self.task_expected_output}
-            </task_expected_output>
+        Returns:
+            str: The key of the agent's output in a Crew checkpoint store.
+        """
+        return make_cache_key(
+            self.model,
+            [struct_the_prompt("system", self.backstory), struct_the_prompt("user", self.create_prompt())],
+            tools=[tool.fn_signature for tool in self.tools],
+            kind="crew_checkpoint",
+        )
+
+    async def aexecute(self, on_output: Callable[[str], None] | None = None) -> str:
+        """
+        Runs the agent's task without passing the output to its dependents.
 
-            <context>
-            {self.context}
-            </context>
+        Args:
+            on_output (Callable[[str], None] | None): Called with each new piece of the output as
+                it is generated. Defaults to None.
 
-            Your response:
-            """
-        ).strip()
+        Returns:
+            str: The output generated by the agent.
+        """
+        msg = self.create_prompt()
+        with agent_scope(self.name), tracer.span("agent.run"):
+            return await self.react_agent.arun(msg, on_output)
 
-        return prompt
+    def execute(self) -> str:
+        """Synchronous wrapper around `aexecute`."""
+        return run_sync(self.aexecute())
 
-    def run(self) -> str:
+    async def arun(self) -> str:
         """
-        Runs the agent's task and generates the output.
+        Runs the agent's task and passes the output to its dependents.
 
         Returns:
             str: The output generated by the agent.
         """
-        msg = self.create_prompt()
-        output = self.react_agent.run(msg)
+        output = await self.aexecute()
 
         # Pass the output to all dependent agents
         for dependent in self.dependents:
             dependent.receive_context(output)
         return output
+
+    def run(self) -> str:
+        """
+        Runs the agent's task and generates the output. Thin synchronous wrapper around `arun`.
+
+        Returns:
+            str: The output generated by the agent.
+        """
+        return run_sync(self.arun())
@@ -1,29 +1,102 @@
+import asyncio
+import time
+import uuid
+from typing import AsyncIterator
 from collections import deque
-from colorama import Fore
-from graphviz import Digraph  
+from contextvars import ContextVar
+from src.utils.async_runner import run_sync
+from src.utils.logging import Fore
+from src.utils.cache import ResponseCache
+from src.utils.telemetry import tracer
 
 
-## Corrected Context Manager Class
-class Crew:
-    Current_crew = None  # Class-level attribute
+# Crew being defined in the current thread / task: agents created inside `with Crew():` join it
+_current_crew: ContextVar["Crew | None"] = ContextVar("current_crew", default=None)
+
+
+class _OutputStream:
+    """The output of an agent as it is generated, readable section by section by its dependents."""
 
     def __init__(self):
+        self._pieces = []
+        self._text = ""  # Joined lazily, when a reader needs it
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def write(self, piece: str) -> None:
+        if piece:
+            self._pieces.append(piece)
+            self._changed.set()
+
+    def close(self, output: str) -> None:
+        """Ends the stream; completes it with `output` if only part of it (or nothing) was streamed."""
+        streamed = self.text()
+        if output.startswith(streamed):
+            self.write(output[len(streamed):])
+        self._closed = True
+        self._changed.set()
+
+    def text(self) -> str:
+        if self._pieces:
+            self._text += "".join(self._pieces)
+            self._pieces.clear()
+        return self._text
+
+    async def sections(self, delimiter: str) -> AsyncIterator[str]:
+        """Yields each non-empty section as soon as the delimiter after it (or the end of the output) arrives."""
+        position = 0
+        while True:
+            text = self.text()
+            end = text.find(delimiter, position)
+            if end != -1:
+                section, position = text[position:end].strip(), end + len(delimiter)
+                if section:
+                    yield section
+                continue
+            if self._closed:
+                rest = text[position:].strip()
+                if rest:
+                    yield rest
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+## Corrected Context Manager Class
+class Crew:
+    def __init__(self, checkpoint: ResponseCache | None = None):
+        """
+        Args:
+            checkpoint (ResponseCache | None): Store for agent outputs, e.g. a SQLiteCache to resume
+                across processes. Agents whose inputs are unchanged reuse their stored output. Defaults to None.
+        """
+        self.id = uuid.uuid4().hex
         self.agents = []
+        self.checkpoint = checkpoint
+        self._token = None
+        self.timings = {}  # Wall-clock seconds per agent name for the last run
+        self.restored = set()  # Names of the agents whose output came from the checkpoint in the last run
 
     def __enter__(self):
-        Crew.Current_crew = self  # Corrected: Use Crew.Current_crew
+        self._token = _current_crew.set(self)
         return self
 
     def __exit__(self, type, value, traceback):
-        Crew.Current_crew = None  # Reset correctly
+        _current_crew.reset(self._token)  # Back to the enclosing crew, if any
 
     def add_agent(self, agent):
         self.agents.append(agent)
 
+    @staticmethod
+    def current() -> "Crew | None":
+        """Returns the crew being defined in the current thread or task, if any."""
+        return _current_crew.get()
+
     @staticmethod
     def register_agent(agent):
-        if Crew.Current_crew is not None:
-            Crew.Current_crew.add_agent(agent)
+        crew = _current_crew.get()
+        if crew is not None:
+            crew.add_agent(agent)
 
     def topological_sort(self):
         """
@@ -61,6 +134,8 @@ class Crew:
         Returns:
             Digraph: A Graphviz Digraph object representing the agent dependencies.
         """
+        from graphviz import Digraph  # Only needed to plot
+
         dot = Digraph(format="png")
 
         # Add nodes and edges
@@ -71,15 +146,163 @@ class Crew:
 
         return dot
 
-    def run(self):
+    async def arun(self, max_workers: int = 1, executor=None, pipeline: bool = False) -> dict:
         """
-        Executes the agents in topological order.
+        Executes the agents, dispatching every agent as soon as its dependencies have finished.
+
+        With ``max_workers=1`` agents run one at a time in topological order. Larger values let
+        independent agents run concurrently on the event loop, at most ``max_workers`` at a time.
+        Each agent receives the outputs of its dependencies in topological order, so the prompts
+        are the same whatever the concurrency.
+
+        With a checkpoint store, every output is saved as soon as its agent finishes, keyed on the
+        agent's prompt inputs and upstream outputs. A rerun after a failure, or after editing some
+        agents, only executes the agents whose key changed: the edited ones and, if their output
+        changed too, their dependents.
+
+        With ``pipeline=True``, agents publish their output while generating it, and agents with a
+        `section_delimiter` do not wait for their dependencies to finish: they run once per section
+        of the upstream outputs (section i of every dependency in one run) as soon as it is complete,
+        and publish each result as a section of their own output. A chain like poet -> translator ->
+        writer then overlaps its stages instead of running them end to end; `max_workers` must allow
+        the stages to run at the same time.
 
         Prints the agent execution results in a formatted manner.
+
+        Args:
+            max_workers (int, optional): Maximum number of agents running at the same time. Defaults to 1.
+            executor (QueueExecutor, optional): Runs the agents in worker processes instead of this one.
+                Defaults to None.
+            pipeline (bool, optional): Start agents with a `section_delimiter` on the first complete
+                section of their dependencies' outputs. Defaults to False.
+
+        Returns:
+            dict: A mapping of agent names to their outputs. The wall-clock time of each agent
+            (summed over its sections when pipelined) is stored in ``self.timings``.
         """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
         sorted_agents = self.topological_sort()
+        order = {agent: index for index, agent in enumerate(sorted_agents)}
+        indegree = {agent: len(agent.dependencies) for agent in sorted_agents}
+        outputs = {}
+        self.timings = {}
+        self.restored = set()
+        semaphore = asyncio.Semaphore(max_workers)
 
+        # Context left over from a previous run would change the prompts (and checkpoint keys)
         for agent in sorted_agents:
-            print(Fore.GREEN + f"RUNNING AGENT: {agent.name}")
-            result = agent.run()
-            print(Fore.RED + f"Result: {result}")
+            agent.context = ""
+
+        streams = {agent: _OutputStream() for agent in sorted_agents} if pipeline else {}
+
+        def sectioned(agent) -> bool:
+            return pipeline and agent.section_delimiter is not None and bool(agent.dependencies)
+
+        async def timed_execute(agent, on_output=None):
+            key = None
+            if self.checkpoint is not None:
+                key = agent.checkpoint_key()
+                saved = self.checkpoint.get(key)
+                if saved is not None:
+                    print(Fore.GREEN + f"RESTORED AGENT FROM CHECKPOINT: {agent.name}")
+                    self.restored.add(agent.name)
+                    return saved, 0.0
+
+            async with semaphore:
+                print(Fore.GREEN + f"RUNNING AGENT: {agent.name}")
+                start = time.perf_counter()
+                if executor is not None:
+                    result = await executor.aexecute(agent, self.id)
+                else:
+                    result = await agent.aexecute(on_output)
+                elapsed = time.perf_counter() - start
+
+            if key is not None:
+                self.checkpoint.set(key, result)
+            return result, elapsed
+
+        async def streamed_execute(agent):
+            result, elapsed = await timed_execute(agent, streams[agent].write)
+            streams[agent].close(result)
+            return result, elapsed
+
+        async def sectioned_execute(agent):
+            dependencies = sorted(agent.dependencies, key=order.get)
+            readers = [streams[dependency].sections(agent.section_delimiter) for dependency in dependencies]
+            results, total = [], 0.0
+            try:
+                while True:
+                    # Section i of every dependency; dependencies with fewer sections contribute nothing
+                    parts = [await anext(reader, None) for reader in readers]
+                    if all(part is None for part in parts):
+                        break
+                    agent.context = ""
+                    for part in parts:
+                        if part is not None:
+                            agent.receive_context(part)
+                    result, elapsed = await timed_execute(agent)
+                    results.append(result)
+                    total += elapsed
+                    streams[agent].write(result + agent.section_delimiter)
+            finally:
+                for reader in readers:
+                    await reader.aclose()
+            output = agent.section_delimiter.join(results)
+            streams[agent].close(output)
+            return output, total
+
+        running = {}
+
+        def dispatch(agent):
+            if sectioned(agent):
+                running[asyncio.ensure_future(sectioned_execute(agent))] = agent
+                return
+            for dependency in sorted(agent.dependencies, key=order.get):
+                agent.receive_context(outputs[dependency])
+            execute = streamed_execute if pipeline else timed_execute
+            running[asyncio.ensure_future(execute(agent))] = agent
+
+        # Agent tasks inherit the context, so their spans are children of this one
+        with tracer.span("crew.run", agents=len(sorted_agents), max_workers=max_workers):
+            try:
+                # Sectioned agents start right away and wait for the sections they need
+                for agent in sorted_agents:
+                    if indegree[agent] == 0 or sectioned(agent):
+                        dispatch(agent)
+
+                while running:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    # Handle simultaneous completions in topological order to keep dispatch deterministic
+                    for task in sorted(done, key=lambda t: order[running[t]]):
+                        agent = running.pop(task)
+                        result, elapsed = task.result()
+                        outputs[agent] = result
+                        self.timings[agent.name] = elapsed
+                        print(Fore.RED + f"Result: {result}")
+                        print(Fore.YELLOW + f"{agent.name} finished in {elapsed:.2f}s")
+
+                        for dependent in agent.dependents:
+                            indegree[dependent] -= 1
+                            if indegree[dependent] == 0 and not sectioned(dependent):
+                                dispatch(dependent)
+            finally:
+                for task in running:
+                    task.cancel()
+
+        return {agent.name: output for agent, output in outputs.items()}
+
+    def run(self, max_workers: int = 1, executor=None, pipeline: bool = False) -> dict:
+        """
+        Executes the agents in dependency order. Thin synchronous wrapper around `arun`.
+
+        Args:
+            max_workers (int, optional): Maximum number of agents running at the same time. Defaults to 1.
+            executor (QueueExecutor, optional): Runs the agents in worker processes. Defaults to None.
+            pipeline (bool, optional): Overlap agents with a `section_delimiter` with their dependencies. Defaults to False.
+
+        Returns:
+            dict: A mapping of agent names to their outputs.
+        """
+        return run_sync(self.arun(max_workers, executor, pipeline))
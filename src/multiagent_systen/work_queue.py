@@ -0,0 +1,452 @@
+"""
+Runs Crew agents in worker processes fed by a SQLite work queue.
+
+The crew process keeps scheduling the DAG (dependencies, context, checkpoints) and only the
+execution of each ready agent is queued. Workers claim tasks, run the agent and write the
+output back. The queue is for a single host: SQLite's WAL mode needs shared memory between
+the processes using the file, so it does not work on a network filesystem.
+
+Usage (workers started separately):
+    python -m src.multiagent_systen.work_queue crew_queue.db [--concurrency 8] [--backend module:factory]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from src.multiagent_systen.agent import Agent
+from src.tool_agent.tool import Tool, tool
+from src.utils.async_runner import spawn_context
+from src.utils.backends import LLMBackend
+from src.utils.cache import ResponseCache, SQLiteCache
+from src.utils.logging import Fore
+
+
+class WorkerError(Exception):
+    """Raised in the crew process when a worker failed to execute an agent."""
+
+
+class WorkQueue:
+    """
+    Queue of agent tasks stored in a SQLite database, shareable between processes.
+
+    A task is claimed by one worker at a time. Tasks claimed longer than `lease` seconds ago
+    without a result are considered abandoned (e.g. the worker was killed) and handed out again.
+
+    Args:
+        path (str): Path of the database file.
+        lease (float): Seconds a worker may hold a task before it is reclaimed. Defaults to 600.
+    """
+
+    def __init__(self, path: str, lease: float = 600.0):
+        self.path = path
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, crew_id TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, worker TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, claimed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id)")
+
+    def put(self, crew_id: str, payload: dict) -> int:
+        """
+        Adds a task.
+
+        Args:
+            crew_id (str): ID of the crew the task belongs to.
+            payload (dict): JSON-serializable description of the agent to run.
+
+        Returns:
+            int: The task ID.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO tasks (crew_id, payload, status) VALUES (?, ?, 'pending')",
+                (crew_id, json.dumps(payload)),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Optional[tuple[int, dict]]:
+        """
+        Takes the oldest pending (or abandoned) task.
+
+        Args:
+            worker_id (str): Name of the claiming worker, for inspection.
+
+        Returns:
+            Optional[tuple[int, dict]]: The task ID and payload, or None if the queue is empty.
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers never claim the same task
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'running' AND claimed_at < ?) ORDER BY id LIMIT 1",
+                    (now - self.lease,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (worker_id, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def complete(self, task_id: int, result: str) -> None:
+        """Stores the output of a task."""
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET status = 'done', result = ? WHERE id = ?", (result, task_id))
+
+    def fail(self, task_id: int, error: str) -> None:
+        """Records the failure of a task."""
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET status = 'failed', error = ? WHERE id = ?", (error, task_id))
+
+    def delete(self, task_id: int) -> None:
+        """Removes a task, once its result has been read or nobody is waiting for it any more."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def state(self, task_id: int) -> tuple[str, Optional[str], Optional[str]]:
+        """
+        Reads the state of a task.
+
+        Returns:
+            tuple: The status ('pending', 'running', 'done' or 'failed'), the result and the error.
+
+        Raises:
+            KeyError: If the task does not exist.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status, result, error FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(task_id)
+        return row
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def _tool_reference(t: Tool) -> list[str]:
+    if "<locals>" in t.fn.__qualname__:
+        raise ValueError(f"Tool '{t.name}' is not defined at module level, so workers cannot import it.")
+    return [t.fn.__module__, t.fn.__qualname__]
+
+
+def _resolve_tool(module: str, qualname: str) -> Tool:
+    target = importlib.import_module(module)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    # The `@tool` decorator leaves a Tool under the function's name; a plain function is wrapped here
+    return target if isinstance(target, Tool) else tool(target)
+
+
+def _cache_reference(cache: Optional[ResponseCache]) -> Optional[dict]:
+    if cache is None:
+        return None
+    if not isinstance(cache, SQLiteCache):
+        raise ValueError(
+            f"A {type(cache).__name__} cannot be shared with worker processes; use a SQLiteCache or no cache."
+        )
+    return {"path": os.path.abspath(cache.path), "max_size": cache.max_size, "ttl": cache.ttl}
+
+
+_worker_caches: dict[tuple, SQLiteCache] = {}
+_worker_caches_lock = threading.Lock()
+
+
+def _resolve_cache(reference: Optional[dict]) -> Optional[SQLiteCache]:
+    if reference is None:
+        return None
+    key = (reference["path"], reference["max_size"], reference["ttl"])
+    # One connection per cache file for all the agents a worker runs
+    with _worker_caches_lock:
+        if key not in _worker_caches:
+            _worker_caches[key] = SQLiteCache(*key)
+        return _worker_caches[key]
+
+
+def agent_payload(agent: Agent) -> dict:
+    """
+    Describes an agent, with the context it received, so that a worker can rebuild and run it.
+
+    Args:
+        agent (Agent): The agent to serialize.
+
+    Returns:
+        dict: A JSON-serializable description.
+
+    Raises:
+        ValueError: If one of the agent's tools cannot be imported by a worker, or its cache
+            cannot be shared with one (only a SQLiteCache can).
+    """
+    return {
+        "name": agent.name,
+        "backstory": agent.backstory,
+        "task_description": agent.task_description,
+        "task_expected_output": agent.task_expected_output,
+        "model": agent.model,
+        "tools": [_tool_reference(t) for t in agent.tools],
+        "cache": _cache_reference(agent.cache),
+        "max_history_tokens": agent.max_history_tokens,
+        "max_observation_chars": agent.max_observation_chars,
+        "context": agent.context,
+    }
+
+
+def agent_from_payload(payload: dict, backend: Optional[LLMBackend] = None) -> Agent:
+    """
+    Rebuilds an agent described by `agent_payload`.
+
+    Args:
+        payload (dict): The agent description.
+        backend (Optional[LLMBackend]): Backend of the worker. Defaults to None (the shared client).
+
+    Returns:
+        Agent: The agent, with its context restored.
+    """
+    agent = Agent(
+        name=payload["name"],
+        backstory=payload["backstory"],
+        task_description=payload["task_description"],
+        task_expected_output=payload["task_expected_output"],
+        tools=[_resolve_tool(module, qualname) for module, qualname in payload["tools"]],
+        llm=payload["model"],
+        cache=_resolve_cache(payload.get("cache")),
+        max_history_tokens=payload.get("max_history_tokens"),
+        backend=backend,
+        max_observation_chars=payload.get("max_observation_chars"),
+    )
+    agent.context = payload["context"]
+    return agent
+
+
+async def _run_task(queue: WorkQueue, task_id: int, payload: dict, backend, semaphore: asyncio.Semaphore) -> None:
+    try:
+        output = await agent_from_payload(payload, backend).aexecute()
+    except Exception as e:
+        await asyncio.to_thread(queue.fail, task_id, f"{type(e).__name__}: {e}")
+    else:
+        await asyncio.to_thread(queue.complete, task_id, output)
+    finally:
+        semaphore.release()
+
+
+async def aserve(
+    path: str,
+    backend: Optional[LLMBackend] = None,
+    concurrency: int = 1,
+    poll_interval: float = 0.05,
+    stop_event=None,
+    lease: float = 600.0,
+) -> None:
+    """
+    Worker loop: claims tasks and runs up to `concurrency` agents at a time on the event loop.
+
+    Args:
+        path (str): Path of the queue database.
+        backend (Optional[LLMBackend]): Backend used by the agents. Defaults to None (the shared client).
+        concurrency (int): Agents run at the same time by this worker. Defaults to 1.
+        poll_interval (float): Seconds between polls of an empty queue. Defaults to 0.05.
+        stop_event: Object with an ``is_set()`` method ending the loop, e.g. a multiprocessing.Event.
+            Defaults to None (run forever).
+        lease (float): Seconds before a claimed task is considered abandoned. Defaults to 600.
+    """
+    queue = WorkQueue(path, lease)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    semaphore = asyncio.Semaphore(concurrency)
+    running = set()
+    backoff = poll_interval
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            await semaphore.acquire()
+            try:
+                # The claim may wait for the database's write lock, so it runs off the event loop
+                claimed = await asyncio.to_thread(queue.claim, worker_id)
+            except sqlite3.OperationalError as e:
+                # e.g. "database is locked" when many workers contend: try again later
+                semaphore.release()
+                print(Fore.YELLOW + f"\nWorker {worker_id} could not claim a task ({e}); retrying in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            backoff = poll_interval
+            if claimed is None:
+                semaphore.release()
+                await asyncio.sleep(poll_interval)
+                continue
+
+            task = asyncio.ensure_future(_run_task(queue, *claimed, backend, semaphore))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        await asyncio.gather(*running)
+    finally:
+        queue.close()
+
+
+def serve(
+    path: str,
+    backend_factory: Optional[Callable[[], LLMBackend]] = None,
+    concurrency: int = 1,
+    poll_interval: float = 0.05,
+    stop_event=None,
+    lease: float = 600.0,
+) -> None:
+    """
+    Runs a worker in the current process until `stop_event` is set. See `aserve`.
+
+    Args:
+        backend_factory (Optional[Callable]): Builds the worker's backend; it must be importable
+            (module-level) when workers are started by QueueExecutor. Defaults to None (the shared client).
+    """
+    backend = backend_factory() if backend_factory is not None else None
+    asyncio.run(aserve(path, backend, concurrency, poll_interval, stop_event, lease))
+
+
+class QueueExecutor:
+    """
+    Executes Crew agents through a WorkQueue instead of in the crew's process.
+
+    Pass it to ``Crew.run(executor=...)``. Workers are either started here, as local processes,
+    or separately with ``python -m src.multiagent_systen.work_queue`` on the same machine: the
+    queue file must not be on a network filesystem. Several crews, in one process or many, can
+    share one queue.
+
+    Args:
+        path (str): Path of the queue database.
+        poll_interval (float): Seconds between checks for a task's result. Defaults to 0.05.
+        lease (float): Seconds before a claimed task is considered abandoned. Defaults to 600.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05, lease: float = 600.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.queue = WorkQueue(path, lease)
+        self._processes = []
+        self._stop_event = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    async def aexecute(self, agent: Agent, crew_id: str) -> str:
+        """
+        Queues an agent and waits for a worker to return its output.
+
+        Args:
+            agent (Agent): The agent, with its context already received.
+            crew_id (str): ID of the crew the agent belongs to.
+
+        Returns:
+            str: The output of the agent.
+
+        Raises:
+            WorkerError: If the worker failed to execute the agent.
+            ValueError: If the agent cannot be described to a worker (see `agent_payload`).
+        """
+        # Database calls run in a thread: they may wait for another process's write lock
+        task_id = await asyncio.to_thread(self.queue.put, crew_id, agent_payload(agent))
+        try:
+            while True:
+                status, result, error = await asyncio.to_thread(self.queue.state, task_id)
+                if status == "done":
+                    return result
+                if status == "failed":
+                    raise WorkerError(f"Agent {agent.name} failed in a worker: {error}")
+                if self._processes and not any(process.is_alive() for process in self._processes):
+                    raise WorkerError("Every local worker process has exited.")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            # The result is read (or no longer wanted): the row is not needed any more
+            await asyncio.to_thread(self.queue.delete, task_id)
+
+    def start_workers(
+        self,
+        processes: Optional[int] = None,
+        backend_factory: Optional[Callable[[], LLMBackend]] = None,
+        concurrency: int = 1,
+    ) -> None:
+        """
+        Starts local worker processes.
+
+        Args:
+            processes (Optional[int]): Number of processes. Defaults to the number of CPUs.
+            backend_factory (Optional[Callable]): Module-level function building each worker's
+                backend. Defaults to None (the shared client).
+            concurrency (int): Agents run at the same time by each worker. Defaults to 1.
+        """
+        context = spawn_context()
+        if self._stop_event is None:
+            self._stop_event = context.Event()
+
+        for _ in range(processes or os.cpu_count() or 1):
+            process = context.Process(
+                target=serve,
+                args=(self.path, backend_factory, concurrency, self.poll_interval, self._stop_event, self.lease),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def stop_workers(self, timeout: Optional[float] = None) -> None:
+        """
+        Asks the local workers to finish their current agents and exit, then waits for them.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for each worker before terminating it. Defaults to None.
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._stop_event = None
+
+    def close(self) -> None:
+        """Stops the local workers and closes the queue."""
+        self.stop_workers()
+        self.queue.close()
+
+
+def _load(reference: str):
+    module, _, attr = reference.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a Crew worker pulling agents from a SQLite work queue.")
+    parser.add_argument("queue", help="Path of the queue database.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Agents run at the same time by this worker.")
+    parser.add_argument("--backend", help="module:function building the LLM backend (defaults to the shared client).")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Seconds between polls of an empty queue.")
+    args = parser.parse_args()
+
+    serve(args.queue, _load(args.backend) if args.backend else None, args.concurrency, args.poll_interval)
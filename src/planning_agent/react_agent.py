@@ -1,15 +1,22 @@
 ##  I have to create agent that can use tool and respond to user queries
 
-from src.utils.completions import ChatHistory,generate_response,struct_the_prompt,update_chat_history
-from src.tool_agent.tool import Tool,validate_arguments
-from groq import Groq
-from dotenv import load_dotenv
-import json
-from typing import List
-from colorama import Fore
-from src.utils.extraction import extract_tag_content
+from src.utils.completions import ChatHistory,agenerate_response,astream_response,struct_the_prompt,update_chat_history
+from src.utils.async_runner import iterate_sync, run_sync
+from src.utils.batch import BatchResult, BatchStats, abatch
+from src.utils.cache import CacheStats, ResponseCache
+from src.utils.prompts import join_tool_signatures
+from src.utils.logging import Fore
+from src.utils.compaction import HistoryCompactor
+from src.tool_agent.tool import Tool
+from src.tool_agent.tool_executor import ToolExecutor
+from src.tool_agent.speculation import ToolSpeculator
+from src.tool_agent.spill import ObservationSpiller, SpillStore
+from src.utils.backends import LLMBackend
+from src.utils.llm_client import get_default_client
+import asyncio
+from typing import AsyncIterator, Callable, Iterable, Iterator, List
+from src.utils.extraction import TagExtractor
 
-load_dotenv()
 
 REACT_SYSTEM_PROMPT = """
 You operate by running a loop with the following steps: Thought, Action, Observation.
@@ -49,29 +56,60 @@ Additional constraints:
 """
 BASE_SYSTEM_PROMPT = ""
 
+# Compiled once and shared by every agent, parsed in a single pass per completion
+REACT_TAGS = TagExtractor(["response", "thought", "tool_call"])
+
 class ReactAgent:
-    def __init__(self,tools:List[Tool] | Tool,model:str = 'llama-3.3-70b-versatile',system_prompt:str =BASE_SYSTEM_PROMPT)->None:
-        self.client = Groq()
+    def __init__(self,tools:List[Tool] | Tool,model:str = 'llama-3.3-70b-versatile',system_prompt:str =BASE_SYSTEM_PROMPT,stream:bool = False,cache:ResponseCache | None = None,tool_timeout:float | None = None,max_history_tokens:int | None = None,compaction_threshold:int | None = None,backend:LLMBackend | None = None,speculate:bool = True,max_observation_chars:int | None = None,spill_store:SpillStore | None = None)->None:
+        # Any LLMBackend works, e.g. an LLMClient with its own limits or an offline ScriptedBackend
+        self.client = backend if backend is not None else get_default_client()
         self.model = model
         self.tools = tools
         self.system_prompt = system_prompt
         self.max_iter = 20
+        self.max_history_tokens = max_history_tokens  # Approximate token budget of the conversation
+        self.compaction_threshold = compaction_threshold  # Evicted tokens that trigger a rolling summary
+        self.stream = stream  # Parse tags while the completion streams in
+        self.cache = cache  # Optional response cache shared with other agents
+        self.speculate = speculate  # Start pure tools on predicted arguments while streaming
+        self.speculation_stats = CacheStats()  # Hits: predictions used; misses: predictions discarded
+        self.spiller = None  # Keeps observations over max_observation_chars out of the prompt
+        if self.tools and max_observation_chars is not None:
+            self.spiller = ObservationSpiller(spill_store, max_observation_chars)
+            self.tools = [*self.tools, self.spiller.read_tool]
         if self.tools:
             self.tools_dict = {f.name : f for f in self.tools}
+            self.tool_executor = ToolExecutor(self.tools, timeout=tool_timeout, spiller=self.spiller)
+            system_prompt += "\n" + REACT_SYSTEM_PROMPT % self.add_tool_signatures()
+        # Built once and shared by every conversation of this agent
+        self.system_message = struct_the_prompt(role = "system" , message= system_prompt)
         
     def add_tool_signatures(self) -> str:
         """
         Collects the function signatures of all available tools.
 
         Returns:
-            str: A concatenated string of all tool function signatures in JSON format.
+            str: A concatenated string of all tool function signatures in JSON format, ordered by tool name.
         """
-        return "".join([tool.fn_signature for tool in self.tools])
+        return join_tool_signatures(self.tools)
 
     
+    async def aprocess_tool_calls(self, tool_calls_content: list) -> dict:
+        """
+        Validates and executes every tool call of a turn concurrently and collects the results.
+
+        Args:
+            tool_calls_content (list): List of strings, each representing a tool call in JSON format.
+
+        Returns:
+            dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
+        """
+        return await self.tool_executor.arun_calls(tool_calls_content)
+
     def process_tool_calls(self, tool_calls_content: list) -> dict:
         """
         Processes each tool call, validates arguments, executes the tools, and collects results.
+        Thin synchronous wrapper around `aprocess_tool_calls`.
 
         Args:
             tool_calls_content (list): List of strings, each representing a tool call in JSON format.
@@ -79,61 +117,206 @@ class ReactAgent:
         Returns:
             dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
         """
+        return run_sync(self.aprocess_tool_calls(tool_calls_content))
+
+    async def _acomplete_step(self, agent_history: ChatHistory) -> tuple:
+        """
+        Runs one loop iteration from a full completion: parse the tags, then run the tool calls.
+
+        Args:
+            agent_history (ChatHistory): The conversation so far.
+
+        Returns:
+            tuple: The final response (None if the model did not answer yet), the thoughts and the observations.
+        """
+        llm_response = await agenerate_response(self.client, agent_history, self.model, self.cache)
+        
+        tags = REACT_TAGS.extract(str(llm_response))
+
+        res = tags["response"]
+        if res.found:
+            return res.content[0], [], {}
+        
+        thought = tags["thought"]
+        tool_call = tags["tool_call"]
+
         observations = {}
-        for tool_call_str in tool_calls_content:
-            tool_call = json.loads(tool_call_str)
-            tool_name = tool_call["name"]
-            tool = self.tools_dict[tool_name]
+        if tool_call.found:
+            observations = await self.aprocess_tool_calls(tool_call.content)
+        return None, thought.content, observations
 
-            print(Fore.GREEN + f"\nUsing Tool: {tool_name}")
+    async def _astream_step(self, agent_history: ChatHistory, on_response: Callable[[str], None] | None = None) -> tuple:
+        """
+        Runs one loop iteration from a streamed completion.
 
-            # Validate and execute the tool call
-            validated_tool_call = validate_arguments(
-                tool_call, json.loads(tool.fn_signature)
-            )
-            print(Fore.GREEN + f"\nTool call dict: \n{validated_tool_call}")
+        Each tool call starts as soon as its closing </tool_call> tag arrives, while the rest of the
+        completion is still streaming. With `speculate`, pure tools start even earlier, on the
+        arguments predicted from the unfinished call (see ToolSpeculator). The stream is closed
+        as soon as </response> arrives.
 
-            result = tool.run(**validated_tool_call["arguments"])
-            print(Fore.GREEN + f"\nTool result: \n{result}")
+        Args:
+            agent_history (ChatHistory): The conversation so far.
+            on_response (Callable[[str], None] | None): Called with each new piece of the final response.
+
+        Returns:
+            tuple: The final response (None if the model did not answer yet), the thoughts and the observations.
+        """
+        parser = REACT_TAGS.stream()
+        thoughts = []
+        tool_tasks = []
+        speculator = ToolSpeculator(self.tool_executor, self.speculation_stats) if self.speculate else None
+        sent = 0  # Characters of the response already passed to on_response
 
-            # Store the result using the tool call ID
-            observations[validated_tool_call["id"]] = result
+        chunks = astream_response(self.client, agent_history, self.model, self.cache)
+        streamed = False
+        try:
+            async for chunk in chunks:
+                for tag, content in parser.feed(chunk):
+                    if tag == "response":
+                        if on_response is not None and len(content) > sent:
+                            on_response(content[sent:])
+                        return content, thoughts, {}
+                    if tag == "thought":
+                        thoughts.append(content)
+                    else:
+                        if speculator is not None:
+                            speculator.confirm(content)
+                        tool_tasks.append(asyncio.create_task(self.tool_executor.arun_call(content, len(tool_tasks))))
+                if speculator is not None and parser.open_tag == "tool_call":
+                    speculator.predict(parser.partial())
+                elif on_response is not None and parser.open_tag == "response":
+                    text = parser.partial(settled=True).lstrip()
+                    if len(text) > sent:
+                        on_response(text[sent:])
+                        sent = len(text)
+            streamed = True
+        finally:
+            await chunks.aclose()
+            if not streamed:
+                # Answered (or failed) before the tool calls finished: their observations are not needed
+                for task in tool_tasks:
+                    task.cancel()
+                await asyncio.gather(*tool_tasks, return_exceptions=True)
+            if speculator is not None:
+                # Every call is complete by now: drop the predictions none of them matched
+                speculator.finish(cancel_all=not streamed)
 
-        return observations
+        return None, thoughts, dict(await asyncio.gather(*tool_tasks))
     
     
-    def run(self,usr_msg:str)->str:
+    async def arun(self,usr_msg:str,on_response:Callable[[str], None] | None = None)->str:
+        """
+        Runs the Thought / Action / Observation loop for a user message without blocking the event loop.
+
+        Tool calls of a turn run concurrently without blocking other conversations on the same loop.
+
+        Args:
+            usr_msg (str): The user's question.
+            on_response (Callable[[str], None] | None): Called with each new piece of the final response
+                as it arrives, e.g. to feed downstream agents. Pieces arrive incrementally when the
+                answer is streamed, and all at once otherwise. Defaults to None.
+
+        Returns:
+            str: The final response from the agent.
+        """
         usr_prompt = struct_the_prompt(role = "user" , message=usr_msg , tag = "question")
-        
-        if self.tools:
-            self.system_prompt += ( "\n" + REACT_SYSTEM_PROMPT % self.add_tool_signatures())
             
         agent_history = ChatHistory([
-            struct_the_prompt(role = "system" , message= self.system_prompt),
+            self.system_message,
             usr_prompt
-        ])
+        ], pinned=2, max_tokens=self.max_history_tokens)
         
-        if self.tools:
-            for _ in range(self.max_iter):
-                llm_response = generate_response(self.client, agent_history, self.model)
-                
-                res = extract_tag_content(str(llm_response), "response")
-                if res.found:
-                    return res.content[0]
-                
-                thought = extract_tag_content(str(llm_response),"thought")
-                tool_call = extract_tag_content(str(llm_response),"tool_call")
-                
-                update_chat_history(agent_history,struct_the_prompt("assistant" , thought.content[0],"thought"))
-                #print(Fore.RED + f"\n agent history {agent_history}")
-                
-                print(Fore.MAGENTA + f"\nThought: {thought.content[0]}")
+        compactor = None
+        if self.compaction_threshold is not None:
+            compactor = HistoryCompactor(self.client, self.model, self.compaction_threshold, cache=self.cache)
+            compactor.attach(agent_history)
+
+        try:
+            if self.tools:
+                for _ in range(self.max_iter):
+                    if compactor is not None:
+                        compactor.install()
+
+                    if self.stream:
+                        response, thoughts, observations = await self._astream_step(agent_history, on_response)
+                    else:
+                        response, thoughts, observations = await self._acomplete_step(agent_history)
+                        if response is not None and on_response is not None:
+                            on_response(response)
+
+                    if response is not None:
+                        return response
+                    
+                    # A tool call without a <thought> first is a valid completion too
+                    thought = thoughts[0] if thoughts else ""
+                    update_chat_history(agent_history,struct_the_prompt("assistant" , thought,"thought"))
+                    #print(Fore.RED + f"\n agent history {agent_history}")
+                    
+                    if thought:
+                        print(Fore.MAGENTA + f"\nThought: {thought}")
+                    
+                    if observations:
+                        print(Fore.BLUE + f"\nObservations: {observations}")
+                        update_chat_history(agent_history , struct_the_prompt("user" , f"observations are {observations}","observation"))
+
+                    if compactor is not None:
+                        # Summarizes in the background while the next completion and tool calls run
+                        compactor.maybe_compact()
                 
-                if tool_call.found:
-                    observations = self.process_tool_calls(tool_call.content)
-                    print(Fore.BLUE + f"\nObservations: {observations}")
-                    update_chat_history(agent_history , struct_the_prompt("user" , f"observations are {observations}","observation"))
-            
-        return generate_response(self.client, agent_history, self.model)
-        
-        
\ No newline at end of file
+            if on_response is None:
+                return await agenerate_response(self.client, agent_history, self.model, self.cache)
+
+            pieces = []
+            async for piece in astream_response(self.client, agent_history, self.model, self.cache):
+                pieces.append(piece)
+                on_response(piece)
+            return "".join(pieces)
+        finally:
+            if compactor is not None:
+                compactor.close()
+
+    def run(self,usr_msg:str,on_response:Callable[[str], None] | None = None)->str:
+        """
+        Runs the agent loop for a user message. Thin synchronous wrapper around `arun`.
+
+        Args:
+            usr_msg (str): The user's question.
+            on_response (Callable[[str], None] | None): Called with each new piece of the final response,
+                from the event loop thread. Defaults to None.
+
+        Returns:
+            str: The final response from the agent.
+        """
+        return run_sync(self.arun(usr_msg, on_response))
+
+    async def arun_batch(self, messages: Iterable[str], concurrency: int = 8, stats: BatchStats | None = None) -> AsyncIterator[BatchResult]:
+        """
+        Answers many independent user messages, at most `concurrency` at a time, without blocking the event loop.
+
+        Every conversation shares the agent's system prompt, tool registry and client. To go through
+        a provider batch endpoint, create the agent with ``backend=BatchingBackend(...)``.
+
+        Args:
+            messages (Iterable[str]): The user questions; may be a lazy stream.
+            concurrency (int, optional): Maximum conversations in flight. Defaults to 8.
+            stats (BatchStats | None, optional): Counters updated as results arrive. Defaults to None.
+
+        Yields:
+            BatchResult: The result of each message, as soon as it finishes.
+        """
+        async for result in abatch(self.arun, messages, concurrency, stats):
+            yield result
+
+    def run_batch(self, messages: Iterable[str], concurrency: int = 8, stats: BatchStats | None = None) -> Iterator[BatchResult]:
+        """
+        Answers many independent user messages concurrently. Synchronous counterpart of `arun_batch`.
+
+        Args:
+            messages (Iterable[str]): The user questions; may be a lazy stream.
+            concurrency (int, optional): Maximum conversations in flight. Defaults to 8.
+            stats (BatchStats | None, optional): Counters updated as results arrive. Defaults to None.
+
+        Yields:
+            BatchResult: The result of each message, as soon as it finishes.
+        """
+        return iterate_sync(self.arun_batch(messages, concurrency, stats))
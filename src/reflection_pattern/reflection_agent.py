@@ -1,18 +1,18 @@
+import asyncio
+import difflib
 import os
-from dotenv import load_dotenv  
-from src.utils.completions import generate_response,struct_the_prompt,FixedFirstChatHistory,update_chat_history
-from groq import Groq
+import re
+from src.utils.completions import agenerate_response,struct_the_prompt,FixedFirstChatHistory,update_chat_history
+from src.utils.async_runner import run_sync
+from src.utils.cache import ResponseCache
+from src.utils.backends import LLMBackend
+from src.utils.llm_client import get_default_client
 
 # lets write Logic -- so we need a chat history, we have to append generate output from llm and than
 # and send that output to critic for suggesting some changes we can repeat this process for 5-6 times
 # or we can stop early we get the desired output
 
 
-load_dotenv()  
-
-
-
-
 BASE_GENERATION_SYSTEM_PROMPT = """
 Your task is to Generate the best content possible for the user's request.
 If the user provides critique, respond with a revised version of your previous attempt.
@@ -25,6 +25,52 @@ If the user content has something wrong or something to be improved, output a li
 and critiques. If the user content is ok and there's nothing to change, output this: <OK>
 """
 
+# Appended to the reflection prompt when several candidates compete for the next step
+SCORING_INSTRUCTION = """
+Finally, rate the content from 0 to 10 and output the rate enclosed in <score></score> tags.
+"""
+
+_SCORE_PATTERN = re.compile(r"<score>\s*(\d+(?:\.\d+)?)\s*</score>")
+
+
+def drafts_converged(previous: str, current: str, threshold: float) -> bool:
+    """
+    Cheaply checks whether two consecutive drafts are at least `threshold` similar.
+
+    The constant-time and linear upper bounds of difflib's similarity ratio are tried first,
+    so clearly different drafts never pay for the full comparison.
+
+    Args:
+        previous (str): The draft of the previous step.
+        current (str): The draft of this step.
+        threshold (float): Similarity ratio, from 0 (unrelated) to 1 (identical).
+
+    Returns:
+        bool: True if the drafts are similar enough.
+    """
+    matcher = difflib.SequenceMatcher(None, previous, current, autojunk=False)
+    return (
+        matcher.real_quick_ratio() >= threshold
+        and matcher.quick_ratio() >= threshold
+        and matcher.ratio() >= threshold
+    )
+
+
+def score_critique(critique: str) -> float:
+    """
+    Reads the score a critique gave to a draft.
+
+    Args:
+        critique (str): The reflection LLM response.
+
+    Returns:
+        float: The score from the <score></score> tags, 10 for an <OK> and 0 when missing.
+    """
+    if "<OK>" in critique:
+        return 10.0
+    match = _SCORE_PATTERN.search(critique)
+    return float(match.group(1)) if match else 0.0
+
 
 class ReflectAgent:
     """
@@ -34,32 +80,74 @@ class ReflectAgent:
 
     Attributes:
         model (str): The name of the LLM model used for generation and reflection.
-        client (Groq): The client instance to communicate with the LLM.
+        client (LLMBackend): The client instance to communicate with the LLM, the shared LLMClient by default.
+        cache (ResponseCache | None): Optional cache for repeated generation and critique prompts.
     """
 
-    def __init__(self, model: str = "llama-3.3-70b-versatile"):
+    def __init__(self, model: str = "llama-3.3-70b-versatile", cache: ResponseCache | None = None, max_history_tokens: int | None = None, backend: LLMBackend | None = None):
         """
         Initializes the ReflectAgent with the specified model.
 
         Args:
             model (str): The model name for LLM interactions. Default is "llama-3.3-70b-versatile".
+            cache (ResponseCache | None): Optional response cache, may be shared with other agents. Default is None.
+            max_history_tokens (int | None): Approximate token budget of each conversation history. Default is None.
+            backend (LLMBackend | None): LLM backend to use instead of the shared client, e.g. a ScriptedBackend. Default is None.
         """
-        self.client = Groq()
+        self.client = backend if backend is not None else get_default_client()
         self.model = model
+        self.cache = cache
+        self.max_history_tokens = max_history_tokens
 
-    def _request_completion(self, history: list) -> str:
+    async def _request_completion(self, history: list, **params) -> str:
         """
         Sends a request to the LLM to generate a response based on the provided history.
 
         Args:
             history (list): A list of messages representing the conversation history.
+            **params: Extra sampling parameters (e.g. seed).
 
         Returns:
             str: The LLM-generated response.
         """
-        return generate_response(self.client, history, self.model)
+        return await agenerate_response(self.client, history, self.model, self.cache, **params)
 
-    def system_llm(self, system_history: list) -> str:
+    async def _best_of(
+        self,
+        generation_history,
+        reflection_history,
+        n_candidates: int,
+        previous: str | None = None,
+        convergence_threshold: float | None = None,
+    ) -> tuple[str, str | None]:
+        """
+        Generates `n_candidates` drafts concurrently, critiques them concurrently and keeps the best.
+
+        Each draft uses its own sampling seed, so they differ (and are cached separately).
+        If a draft has converged with `previous`, the critiques are skipped.
+
+        Returns:
+            tuple[str, str | None]: The best-scored draft and its critique, or the converged draft and None.
+        """
+        drafts = await asyncio.gather(
+            *(self._request_completion(generation_history, seed=index) for index in range(n_candidates))
+        )
+        if previous is not None and convergence_threshold is not None:
+            for draft in drafts:
+                if drafts_converged(previous, draft, convergence_threshold):
+                    return draft, None
+
+        critiques = await asyncio.gather(
+            *(
+                self._request_completion([*reflection_history, struct_the_prompt(role="user", message=draft)])
+                for draft in drafts
+            )
+        )
+        # max keeps the first of equally scored drafts
+        best = max(range(n_candidates), key=lambda index: score_critique(critiques[index]))
+        return drafts[best], critiques[best]
+
+    async def asystem_llm(self, system_history: list) -> str:
         """
         Generates a response from the system LLM based on the provided system history.
 
@@ -69,10 +157,14 @@ class ReflectAgent:
         Returns:
             str: The system LLM's response.
         """
-        response = self._request_completion(system_history)
+        response = await self._request_completion(system_history)
         return response
 
-    def reflect_llm(self, reflect_history: list) -> str:
+    def system_llm(self, system_history: list) -> str:
+        """Synchronous wrapper around `asystem_llm`."""
+        return run_sync(self.asystem_llm(system_history))
+
+    async def areflect_llm(self, reflect_history: list) -> str:
         """
         Generates a response from the reflection LLM based on the provided reflection history.
 
@@ -82,36 +174,52 @@ class ReflectAgent:
         Returns:
             str: The reflection LLM's response.
         """
-        response = self._request_completion(reflect_history)
+        response = await self._request_completion(reflect_history)
         return response
 
-    def run(
+    def reflect_llm(self, reflect_history: list) -> str:
+        """Synchronous wrapper around `areflect_llm`."""
+        return run_sync(self.areflect_llm(reflect_history))
+
+    async def arun(
         self,
         user_msg: str,
         generation_system_prompt: str = "",
         reflection_system_prompt: str = "",
-        n_steps: int = 10
+        n_steps: int = 10,
+        n_candidates: int = 1,
+        convergence_threshold: float | None = None,
     ) -> str:
         """
-        Executes the conversational loop between the system and reflection LLMs.
+        Executes the conversational loop between the system and reflection LLMs without blocking the event loop.
+
+        With ``n_candidates > 1`` every step generates that many drafts concurrently, asks the
+        reflection LLM to score each of them concurrently and carries on with the best one.
 
         Args:
             user_msg (str): The user's input message to start the conversation.
             generation_system_prompt (str, optional): Initial prompt for the system LLM. Defaults to "".
             reflection_system_prompt (str, optional): Initial prompt for the reflection LLM. Defaults to "".
             n_steps (int, optional): Maximum number of generation-reflection cycles. Defaults to 10.
+            n_candidates (int, optional): Drafts generated per step. Defaults to 1.
+            convergence_threshold (float | None, optional): Stop, without a critique, once a draft is at
+                least this similar (0 to 1) to the previous one. Defaults to None (only stop on <OK>).
 
         Returns:
             str: The final response generated by the system LLM.
         """
-        
+        if n_candidates < 1:
+            raise ValueError("n_candidates must be at least 1")
+
         # Append base prompts to avoid duplication
         generation_system_prompt += BASE_GENERATION_SYSTEM_PROMPT
         reflection_system_prompt += BASE_REFLECTION_SYSTEM_PROMPT
+        if n_candidates > 1:
+            reflection_system_prompt += SCORING_INSTRUCTION
 
         # Initialize conversation histories
-        generation_history = FixedFirstChatHistory(max_length=5)
-        reflection_history = FixedFirstChatHistory(max_length=5)
+        generation_history = FixedFirstChatHistory(max_length=5, max_tokens=self.max_history_tokens)
+        reflection_history = FixedFirstChatHistory(max_length=5, max_tokens=self.max_history_tokens)
 
         # Create initial prompts
         sys_prompt = struct_the_prompt(role="system", message=generation_system_prompt)
@@ -127,13 +235,32 @@ class ReflectAgent:
         
         # Conversational loop
         for steps in range(n_steps):
-            # Generate system response
-            system_llm_resp = self.system_llm(generation_history)
+            previous_resp = system_llm_resp
+            if n_candidates > 1:
+                # Drafts are critiqued along with their generation, to pick the best one
+                # (_best_of skips the critiques, returning None, once a draft has converged)
+                system_llm_resp, critic_resp = await self._best_of(
+                    generation_history,
+                    reflection_history,
+                    n_candidates,
+                    previous_resp if steps > 0 else None,
+                    convergence_threshold,
+                )
+                if critic_resp is None:
+                    break
+            else:
+                # Generate system response
+                system_llm_resp = await self.asystem_llm(generation_history)
+                # Drafts barely change any more: further critiques will not improve them
+                if steps > 0 and convergence_threshold is not None and drafts_converged(previous_resp, system_llm_resp, convergence_threshold):
+                    break
+
             sys_response_prompt = struct_the_prompt(role="user", message=system_llm_resp)
             update_chat_history(reflection_history, sys_response_prompt)
 
-            # Generate reflection response
-            critic_resp = self.reflect_llm(reflection_history)
+            if n_candidates == 1:
+                # Generate reflection response
+                critic_resp = await self.areflect_llm(reflection_history)
 
             # Break loop if reflection response indicates completion
             if "<OK>" in critic_resp:
@@ -145,4 +272,31 @@ class ReflectAgent:
 
         return system_llm_resp
 
+    def run(
+        self,
+        user_msg: str,
+        generation_system_prompt: str = "",
+        reflection_system_prompt: str = "",
+        n_steps: int = 10,
+        n_candidates: int = 1,
+        convergence_threshold: float | None = None,
+    ) -> str:
+        """
+        Executes the conversational loop between the system and reflection LLMs.
+        Thin synchronous wrapper around `arun`.
 
+        Args:
+            user_msg (str): The user's input message to start the conversation.
+            generation_system_prompt (str, optional): Initial prompt for the system LLM. Defaults to "".
+            reflection_system_prompt (str, optional): Initial prompt for the reflection LLM. Defaults to "".
+            n_steps (int, optional): Maximum number of generation-reflection cycles. Defaults to 10.
+            n_candidates (int, optional): Drafts generated and critiqued concurrently per step. Defaults to 1.
+            convergence_threshold (float | None, optional): Similarity (0 to 1) between consecutive drafts
+                that ends the loop early. Defaults to None.
+
+        Returns:
+            str: The final response generated by the system LLM.
+        """
+        return run_sync(self.arun(
+            user_msg, generation_system_prompt, reflection_system_prompt, n_steps, n_candidates, convergence_threshold
+        ))
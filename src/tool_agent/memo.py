@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from src.utils.cache import CacheStats, MemoryCache
+
+CACHE_POLICIES = ("pure", "ttl", "never")
+
+
+def make_memo_key(tool_name: str, arguments: dict) -> str:
+    """
+    Builds the key of a tool call from the tool identity and its validated arguments.
+
+    Arguments are validated first (types converted, defaults filled in), so calls that differ
+    only in spelling, such as ``{"a": "1"}`` and ``{"a": 1}``, share a key.
+
+    Args:
+        tool_name (str): The tool identity.
+        arguments (dict): The validated arguments.
+
+    Returns:
+        str: The SHA-256 hex digest of the canonical JSON form of the call.
+    """
+    payload = json.dumps(
+        {"tool": tool_name, "arguments": arguments},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=repr,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolMemo:
+    """
+    Memoizes the results of tools declared cacheable with ``@tool(cache="pure")`` or ``@tool(cache="ttl", ttl=...)``.
+
+    Results are kept in a size-bounded LRU MemoryCache. Identical calls running at the same
+    time on one event loop share a single execution. Failed calls are never stored.
+
+    Args:
+        max_size (int): Maximum number of results kept. Defaults to 4096.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self._store = MemoryCache(max_size=max_size)
+        self.stats = CacheStats()
+        self.tool_stats: dict[str, CacheStats] = {}  # Hit / miss counters per tool name
+        self._inflight = {}  # (event loop, key) -> future of the running call
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def _record(self, tool_name: str, hit: bool) -> None:
+        with self._lock:
+            stats = self.tool_stats.setdefault(tool_name, CacheStats())
+        self.stats.record(hit)
+        stats.record(hit)
+
+    def _lookup(self, key: str, ttl: Optional[float]) -> tuple[bool, Any]:
+        # Entries are (stored_at, result) so that None results can be cached too
+        entry = self._store.get(key)
+        if entry is None:
+            return False, None
+        stored_at, result = entry
+        if ttl is not None and time.monotonic() - stored_at > ttl:
+            return False, None
+        return True, result
+
+    async def arun(self, tool, arguments: dict, call: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Returns the memoized result of a call, or runs it and stores the result.
+
+        Args:
+            tool (Tool): The tool being called; its `cache_policy` and `cache_ttl` apply.
+            arguments (dict): The validated arguments.
+            call (Callable[[], Awaitable]): Runs the tool when there is no usable result.
+
+        Returns:
+            tuple: The result, and whether it came from the memo (or from an identical running call).
+        """
+        if tool.cache_policy == "never":
+            return await call(), False
+
+        # Qualified by the function, so same-named tools of different agents do not share results
+        key = make_memo_key(f"{tool.fn.__module__}.{tool.fn.__qualname__}:{tool.name}", arguments)
+        loop = asyncio.get_running_loop()
+        while True:
+            found, result = self._lookup(key, tool.cache_ttl)
+            if found:
+                self._record(tool.name, True)
+                return result, True
+
+            with self._lock:
+                running = self._inflight.get((loop, key))
+                if running is None:
+                    future = self._inflight[(loop, key)] = loop.create_future()
+            if running is None:
+                break
+            try:
+                result = await asyncio.shield(running)
+            except asyncio.CancelledError:
+                if not running.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The caller running the shared call was cancelled (e.g. a discarded speculative
+                # call), but this one was not: look again, and run it ourselves if needed
+                continue
+            self._record(tool.name, True)
+            return result, True
+
+        self._record(tool.name, False)
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marks it retrieved when no identical call is waiting
+            raise
+        else:
+            self._store.set(key, (time.monotonic(), result))
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._inflight[(loop, key)]
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+_default_memo: Optional[ToolMemo] = None
+_default_memo_lock = threading.Lock()
+
+
+def get_tool_memo() -> ToolMemo:
+    """
+    Returns the process-wide ToolMemo shared by every ToolExecutor that is not given one.
+
+    Returns:
+        ToolMemo: The shared memo.
+    """
+    global _default_memo
+
+    with _default_memo_lock:
+        if _default_memo is None:
+            _default_memo = ToolMemo()
+    return _default_memo
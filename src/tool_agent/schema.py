@@ -0,0 +1,290 @@
+import dataclasses
+import inspect
+import json
+import types
+import typing
+from typing import Any, Callable, Literal, Union, get_args, get_origin
+
+# A coercer checks (and when unambiguous converts) one value; `path` names it in error messages
+Coercer = Callable[[Any, str], Any]
+
+_NONE = type(None)
+_EMPTY = inspect.Parameter.empty
+_TRUE = {"true", "yes", "1"}
+_FALSE = {"false", "no", "0"}
+_SEQUENCES = (list, tuple, set, frozenset)
+
+
+def resolve_type_hints(fn: Callable) -> dict:
+    """Returns the resolved annotations of a function, or its raw ones if they cannot be resolved."""
+    try:
+        return typing.get_type_hints(fn)
+    except Exception:
+        # Unresolvable forward references: fall back to the raw annotations
+        return dict(getattr(fn, "__annotations__", {}))
+
+
+def type_name(tp) -> str:
+    """
+    Readable name of a type annotation, as shown to the model in tool signatures.
+
+    Args:
+        tp: A type annotation, e.g. int, list[str] or Optional[dict[str, float]].
+
+    Returns:
+        str: E.g. 'int', 'list[str]' or 'Optional[dict[str, float]]'.
+    """
+    if tp is _EMPTY or tp is Any:
+        return "any"
+    if tp is _NONE or tp is None:
+        return "None"
+
+    origin, args = get_origin(tp), get_args(tp)
+    if dataclasses.is_dataclass(tp):
+        # The model needs the fields to build the object
+        hints = resolve_type_hints(tp)
+        fields = ", ".join(f"{field.name}: {type_name(hints.get(field.name, Any))}" for field in dataclasses.fields(tp))
+        return f"{tp.__name__}{{{fields}}}"
+    if origin is None:
+        return getattr(tp, "__name__", str(tp))
+    if origin is Literal:
+        return f"Literal[{', '.join(repr(arg) for arg in args)}]"
+    if origin is Union or origin is types.UnionType:
+        members = [arg for arg in args if arg is not _NONE]
+        inner = " | ".join(type_name(arg) for arg in members)
+        return f"Optional[{inner}]" if len(members) < len(args) else inner
+    if not args:
+        return origin.__name__
+    return f"{origin.__name__}[{', '.join('...' if arg is Ellipsis else type_name(arg) for arg in args)}]"
+
+
+def _identity(value, path):
+    return value
+
+
+def _parse_json(value: str, path: str, expected: type):
+    # Models sometimes send nested arguments as JSON strings
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError:
+        raise ValueError(f"{path}: expected {expected.__name__}, got {value!r}") from None
+    if not isinstance(parsed, expected):
+        raise ValueError(f"{path}: expected {expected.__name__}, got {value!r}")
+    return parsed
+
+
+def _coerce_bool(value, path):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"{path}: expected bool, got {value!r}")
+
+
+def _coerce_int(value, path):
+    # bool is a subclass of int, but true / false are not integers in JSON Schema
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise ValueError(f"{path}: expected int, got {value!r}")
+
+
+def _coerce_float(value, path):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise ValueError(f"{path}: expected float, got {value!r}")
+
+
+def _coerce_str(value, path):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    raise ValueError(f"{path}: expected str, got {value!r}")
+
+
+_SCALARS = {bool: _coerce_bool, int: _coerce_int, float: _coerce_float, str: _coerce_str}
+
+
+def compile_coercer(tp) -> Coercer:
+    """
+    Builds, once, a function checking and converting values for a type annotation.
+
+    Supports int, float, str, bool, Any, Optional / unions, Literal, list / tuple / set,
+    dict and dataclasses, nested to any depth.
+
+    Args:
+        tp: The type annotation.
+
+    Returns:
+        Coercer: ``coerce(value, path)``, raising ValueError when the value does not fit.
+    """
+    if tp is _EMPTY or tp is Any:
+        return _identity
+    if tp in _SCALARS:
+        return _SCALARS[tp]
+    if tp is _NONE or tp is None:
+        def coerce_none(value, path):
+            if value is None:
+                return None
+            raise ValueError(f"{path}: expected None, got {value!r}")
+        return coerce_none
+
+    origin, args = get_origin(tp), get_args(tp)
+
+    if origin is Literal:
+        def coerce_literal(value, path):
+            if value in args:
+                return value
+            raise ValueError(f"{path}: expected one of {list(args)!r}, got {value!r}")
+        return coerce_literal
+
+    if origin is Union or origin is types.UnionType:
+        optional = _NONE in args
+        members = [compile_coercer(arg) for arg in args if arg is not _NONE]
+        # Values already of a member type are kept as they are, not converted to the first member
+        exact = tuple(arg for arg in args if isinstance(arg, type) and arg is not _NONE)
+        name = type_name(tp)
+
+        def coerce_union(value, path):
+            if value is None and optional:
+                return None
+            if type(value) in exact:
+                return value
+            for member in members:
+                try:
+                    return member(value, path)
+                except ValueError:
+                    pass
+            raise ValueError(f"{path}: expected {name}, got {value!r}")
+        return coerce_union
+
+    container = origin or tp
+    if container in _SEQUENCES:
+        if container is tuple and args and args[-1] is not Ellipsis:
+            positions = [compile_coercer(arg) for arg in args]
+
+            def coerce_fixed_tuple(value, path):
+                if isinstance(value, str):
+                    value = _parse_json(value, path, list)
+                if not isinstance(value, _SEQUENCES) or len(value) != len(positions):
+                    raise ValueError(f"{path}: expected {len(positions)} items, got {value!r}")
+                return tuple(coerce(item, f"{path}[{index}]") for index, (coerce, item) in enumerate(zip(positions, value)))
+            return coerce_fixed_tuple
+
+        item_coercer = compile_coercer(args[0]) if args else _identity
+
+        def coerce_sequence(value, path):
+            if isinstance(value, str):
+                value = _parse_json(value, path, list)
+            if not isinstance(value, _SEQUENCES):
+                raise ValueError(f"{path}: expected {container.__name__}, got {value!r}")
+            return container(item_coercer(item, f"{path}[{index}]") for index, item in enumerate(value))
+        return coerce_sequence
+
+    if container is dict:
+        key_coercer = compile_coercer(args[0]) if args else _identity
+        value_coercer = compile_coercer(args[1]) if args else _identity
+
+        def coerce_dict(value, path):
+            if isinstance(value, str):
+                value = _parse_json(value, path, dict)
+            if not isinstance(value, dict):
+                raise ValueError(f"{path}: expected dict, got {value!r}")
+            return {key_coercer(key, path): value_coercer(item, f"{path}[{key!r}]") for key, item in value.items()}
+        return coerce_dict
+
+    if dataclasses.is_dataclass(tp):
+        hints = resolve_type_hints(tp)
+        fields = {field.name: compile_coercer(hints.get(field.name, Any)) for field in dataclasses.fields(tp)}
+
+        def coerce_dataclass(value, path):
+            if isinstance(value, tp):
+                return value
+            if isinstance(value, str):
+                value = _parse_json(value, path, dict)
+            if not isinstance(value, dict):
+                raise ValueError(f"{path}: expected {tp.__name__} object, got {value!r}")
+            unexpected = value.keys() - fields.keys()
+            if unexpected:
+                raise ValueError(f"{path}: unexpected field(s) {', '.join(sorted(unexpected))}")
+            try:
+                return tp(**{name: fields[name](item, f"{path}.{name}") for name, item in value.items()})
+            except TypeError as e:
+                raise ValueError(f"{path}: {e}") from None
+        return coerce_dataclass
+
+    if isinstance(tp, type):
+        def coerce_instance(value, path):
+            if isinstance(value, tp):
+                return value
+            try:
+                return tp(value)
+            except Exception:
+                raise ValueError(f"{path}: expected {tp.__name__}, got {value!r}") from None
+        return coerce_instance
+
+    # Annotations we cannot interpret are not checked
+    return _identity
+
+
+def compile_validator(fn: Callable) -> Callable[[dict], dict]:
+    """
+    Builds, once, the validator of a tool's arguments from the function signature.
+
+    The validator converts every argument to its annotated type, fills in defaults and
+    rejects missing or unexpected arguments.
+
+    Args:
+        fn (Callable): The tool function.
+
+    Returns:
+        Callable[[dict], dict]: ``validate(arguments)`` returning the converted arguments, or raising ValueError.
+    """
+    hints = resolve_type_hints(fn)
+    params = []
+    accepts_extra = False
+    for name, parameter in inspect.signature(fn).parameters.items():
+        if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+            accepts_extra = True
+            continue
+        if parameter.kind is inspect.Parameter.VAR_POSITIONAL:
+            continue
+        params.append((name, compile_coercer(hints.get(name, parameter.annotation)), parameter.default))
+    names = frozenset(name for name, _, _ in params)
+
+    def validate(arguments: dict) -> dict:
+        if not isinstance(arguments, dict):
+            raise ValueError(f"arguments must be a JSON object, got {arguments!r}")
+        if not accepts_extra:
+            unexpected = arguments.keys() - names
+            if unexpected:
+                raise ValueError(f"unexpected argument(s): {', '.join(sorted(unexpected))}")
+
+        validated = {}
+        for name, coerce, default in params:
+            if name in arguments:
+                validated[name] = coerce(arguments[name], name)
+            elif default is not _EMPTY:
+                validated[name] = default
+            else:
+                raise ValueError(f"missing required argument '{name}'")
+
+        if accepts_extra:
+            validated.update((name, value) for name, value in arguments.items() if name not in names)
+        return validated
+
+    return validate
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from typing import Any, Optional
+
+from src.tool_agent.memo import make_memo_key
+from src.tool_agent.tool_executor import ToolExecutor
+from src.utils.cache import CacheStats
+from src.utils.cassette import get_active_cassette
+from src.utils.telemetry import tracer
+
+_decoder = json.JSONDecoder()
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def predict_json(partial: str) -> Optional[Any]:
+    """
+    Parses a JSON object that is still being generated, as far as it can be trusted.
+
+    A complete object is returned as soon as its closing brace arrives, whatever follows it.
+    An incomplete one is closed at its last finished string, object or array; it is not predicted
+    while a string, number or literal may still be growing, nor after a dangling key, ',' or ':'.
+
+    Args:
+        partial (str): The text received so far, e.g. the content of an unclosed <tool_call> tag.
+
+    Returns:
+        Optional[Any]: The parsed (or predicted) object, or None when nothing can be predicted yet.
+    """
+    text = partial.strip()
+    if not text.startswith("{"):
+        return None
+    try:
+        return _decoder.raw_decode(text)[0]
+    except json.JSONDecodeError:
+        pass
+
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string or not stack or text[-1] not in '"}]':
+        return None
+    try:
+        return json.loads(text + "".join(reversed(stack)))
+    except json.JSONDecodeError:
+        return None
+
+
+class ToolSpeculator:
+    """
+    Starts pure tools (``@tool(cache="pure")``) on the arguments predicted from a tool call that is
+    still being streamed, so their latency overlaps with the rest of the completion.
+
+    Speculative runs go through the executor's ToolMemo: when the finished tool call matches a
+    prediction, its regular execution picks up the running or stored result instead of calling
+    the tool again. Predictions that do not match any finished call are cancelled at the end of
+    the turn. Tools that are not pure only start once their call is complete.
+
+    Args:
+        executor (ToolExecutor): The executor running the turn's tool calls.
+        stats (Optional[CacheStats]): Counters to update: hits are predictions that matched a
+            finished call, misses are discarded ones. Defaults to a new CacheStats.
+    """
+
+    def __init__(self, executor: ToolExecutor, stats: Optional[CacheStats] = None):
+        self.executor = executor
+        self.stats = stats if stats is not None else CacheStats()
+        self._tasks: dict[str, asyncio.Task] = {}  # memo key -> speculative run
+        self._confirmed: set[str] = set()
+        self._last_partial = None
+
+    def _call_key(self, call: Any) -> Optional[tuple]:
+        if not isinstance(call, dict):
+            return None
+        tool = self.executor.tools_dict.get(call.get("name"))
+        if tool is None or tool.cache_policy != "pure":
+            return None
+        try:
+            arguments = tool.validate(call.get("arguments", {}))
+        except Exception:
+            return None
+        return tool, arguments, make_memo_key(tool.name, arguments)
+
+    def predict(self, partial: str) -> None:
+        """
+        Starts the tool of an unfinished tool call if its arguments can be predicted.
+
+        Args:
+            partial (str): The tool call JSON received so far.
+        """
+        if partial == self._last_partial:
+            return
+        self._last_partial = partial
+        cassette = get_active_cassette()
+        if cassette is not None and cassette.replaying:
+            return
+
+        found = self._call_key(predict_json(partial))
+        if found is None:
+            return
+        tool, arguments, key = found
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._speculate(tool, arguments))
+
+    async def _speculate(self, tool, arguments: dict) -> None:
+        with tracer.span("tool.speculate", tool=tool.name):
+            try:
+                await self.executor.arun_memoized(tool, arguments)
+            except Exception:
+                pass  # The regular call reports the error, if it is made at all
+
+    def confirm(self, tool_call: str) -> None:
+        """
+        Marks the prediction matching a finished tool call as used.
+
+        Args:
+            tool_call (str): The complete tool call JSON.
+        """
+        self._last_partial = None
+        try:
+            found = self._call_key(json.loads(tool_call))
+        except json.JSONDecodeError:
+            return
+        if found is not None and found[2] in self._tasks:
+            self._confirmed.add(found[2])
+
+    def finish(self, cancel_all: bool = False) -> None:
+        """
+        Cancels the predictions no finished call matched and updates the counters.
+
+        Args:
+            cancel_all (bool): Cancel the matched predictions too, when the turn is abandoned
+                before their calls are awaited. Defaults to False.
+        """
+        for key, task in self._tasks.items():
+            self.stats.record(key in self._confirmed)
+            if cancel_all or key not in self._confirmed:
+                task.cancel()
+        self._tasks.clear()
+        self._confirmed.clear()
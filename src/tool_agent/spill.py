@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import weakref
+from typing import Any, Optional, Protocol
+
+from src.tool_agent.tool import Tool, get_fn_signatures
+
+READ_TOOL_NAME = "read_observation"
+# Record header of MmapSpillStore files: the handle, then the length of the data that follows
+_RECORD_HEADER = struct.Struct("<20sQ")
+
+
+def _handle_for(data: bytes) -> str:
+    # Content-addressed: the same observation spilled twice is stored once
+    return "obs-" + hashlib.sha256(data).hexdigest()[:16]
+
+
+class SpillStore(Protocol):
+    """Keeps large tool observations out of memory and out of the prompt, readable by byte range."""
+
+    def put(self, text: str) -> str:
+        """Stores an observation and returns its handle."""
+        ...
+
+    def size(self, handle: str) -> int:
+        """Size of an observation in UTF-8 bytes."""
+        ...
+
+    def read(self, handle: str, offset: int = 0, length: Optional[int] = None) -> str:
+        """
+        Reads part of an observation.
+
+        Raises:
+            KeyError: If the handle is unknown.
+        """
+        ...
+
+
+class DiskSpillStore:
+    """
+    Stores each observation in its own file, named after its content hash.
+
+    Args:
+        directory (Optional[str]): Where to keep the files. Defaults to a temporary directory,
+            removed by `close`, or when the store is garbage collected or the process exits.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else tempfile.mkdtemp(prefix="observations-")
+        os.makedirs(self.directory, exist_ok=True)
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, True) if directory is None else None
+
+    def _path(self, handle: str) -> str:
+        if not handle.startswith("obs-") or not handle[4:].isalnum():
+            raise KeyError(handle)
+        return os.path.join(self.directory, handle)
+
+    def put(self, text: str) -> str:
+        data = text.encode("utf-8")
+        handle = _handle_for(data)
+        path = self._path(handle)
+        if not os.path.exists(path):
+            # Written aside and renamed, so readers never see a partial file
+            fd, temporary = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        return handle
+
+    def size(self, handle: str) -> int:
+        try:
+            return os.path.getsize(self._path(handle))
+        except FileNotFoundError:
+            raise KeyError(handle) from None
+
+    def read(self, handle: str, offset: int = 0, length: Optional[int] = None) -> str:
+        try:
+            with open(self._path(handle), "rb") as file:
+                file.seek(max(offset, 0))
+                data = file.read(-1 if length is None else max(length, 0))
+        except FileNotFoundError:
+            raise KeyError(handle) from None
+        # A range may cut a multi-byte character in two
+        return data.decode("utf-8", errors="ignore")
+
+    def close(self) -> None:
+        if self._cleanup is not None:
+            self._cleanup()
+
+
+class MmapSpillStore:
+    """
+    Appends observations to a single file and reads them back through a memory map, so only
+    the pages actually read are loaded.
+
+    Each observation is stored after a small header holding its handle and length, so an
+    existing file is reopened with its observations still readable: the index is rebuilt by
+    hopping from header to header. A record cut short by a crash is dropped.
+
+    Args:
+        path (Optional[str]): The file, created if missing. Defaults to a temporary file, removed
+            by `close`, or when the store is garbage collected or the process exits.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        owned = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="observations-", suffix=".bin")
+            os.close(fd)
+        self.path = path
+        # Read-write without truncating what an earlier run stored
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b")
+        self._index: dict[str, tuple[int, int]] = {}  # handle -> (offset, length) of the data
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self._cleanup = weakref.finalize(self, os.remove, path) if owned else None
+        self._load_index()
+
+    def _load_index(self) -> None:
+        end = self._file.seek(0, os.SEEK_END)
+        position = 0
+        while position + _RECORD_HEADER.size <= end:
+            self._file.seek(position)
+            raw_handle, length = _RECORD_HEADER.unpack(self._file.read(_RECORD_HEADER.size))
+            start = position + _RECORD_HEADER.size
+            if start + length > end:
+                break
+            self._index[raw_handle.decode("ascii", errors="replace")] = (start, length)
+            position = start + length
+        if position < end:
+            self._file.truncate(position)
+
+    def put(self, text: str) -> str:
+        data = text.encode("utf-8")
+        handle = _handle_for(data)
+        with self._lock:
+            if handle not in self._index:
+                offset = self._file.seek(0, os.SEEK_END)
+                self._file.write(_RECORD_HEADER.pack(handle.encode("ascii"), len(data)) + data)
+                self._file.flush()
+                self._index[handle] = (offset + _RECORD_HEADER.size, len(data))
+        return handle
+
+    def size(self, handle: str) -> int:
+        return self._index[handle][1]
+
+    def read(self, handle: str, offset: int = 0, length: Optional[int] = None) -> str:
+        start, size = self._index[handle]
+        offset = min(max(offset, 0), size)
+        end = start + (size if length is None else min(offset + max(length, 0), size))
+        with self._lock:
+            if self._map is None or len(self._map) < end:
+                # The file grew since it was mapped
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if end else None
+            data = self._map[start + offset:end] if self._map is not None else b""
+        return data.decode("utf-8", errors="ignore")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+        if self._cleanup is not None:
+            self._cleanup()
+
+
+_default_store: Optional[DiskSpillStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_spill_store() -> DiskSpillStore:
+    """
+    Returns the process-wide DiskSpillStore shared by every ObservationSpiller that is not given a store.
+
+    Its temporary directory is removed when the process exits.
+
+    Returns:
+        DiskSpillStore: The shared store.
+    """
+    global _default_store
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DiskSpillStore()
+    return _default_store
+
+
+class ObservationSpiller:
+    """
+    Caps the size of the tool observations put in the prompt.
+
+    An observation longer than its cap is written to a SpillStore; the prompt gets its first
+    `preview_chars` characters and a handle. The model reads more through the `read_observation`
+    tool (see `read_tool`), which agents add to their tools when spilling is enabled.
+
+    Args:
+        store (Optional[SpillStore]): Where spilled observations go. Defaults to the process-wide
+            store of `get_spill_store`. The spiller does not close it.
+        max_chars (int): Default cap, in characters, of an observation. Tools override it with
+            ``@tool(max_observation_chars=...)``. Defaults to 4000.
+        preview_chars (Optional[int]): Characters kept in the prompt. Defaults to half the cap.
+    """
+
+    def __init__(self, store: Optional[SpillStore] = None, max_chars: int = 4000, preview_chars: Optional[int] = None):
+        if max_chars < 1:
+            raise ValueError("max_chars must be at least 1")
+        self.store = store if store is not None else get_spill_store()
+        self.max_chars = max_chars
+        self.preview_chars = preview_chars if preview_chars is not None else max_chars // 2
+        self.read_tool = self._make_read_tool()
+
+    def _make_read_tool(self) -> Tool:
+        store, max_chars = self.store, self.max_chars
+
+        def read_observation(handle: str, offset: int = 0, length: int = max_chars) -> str:
+            """
+            Reads more of a tool observation that was too large for the conversation.
+
+            Args:
+                handle (str): The handle given in the truncated observation, e.g. 'obs-1a2b3c4d5e6f7a8b'.
+                offset (int): The UTF-8 byte offset to start at, as given in the truncated observation.
+                length (int): The number of bytes to read.
+            """
+            try:
+                size = store.size(handle)
+            except KeyError:
+                return f"Error: unknown observation handle '{handle}'"
+            length = min(length, max_chars)
+            text = store.read(handle, offset, length)
+            end = min(offset + length, size)
+            if end < size:
+                text += f"\n[bytes {offset}-{end} of {size}; read_observation(handle='{handle}', offset={end}) for more]"
+            return text
+
+        signature = get_fn_signatures(read_observation)
+        return Tool(READ_TOOL_NAME, read_observation, json.dumps(signature, default=repr))
+
+    def _spill(self, text: str) -> tuple[str, int]:
+        handle = self.store.put(text)
+        return handle, self.store.size(handle)
+
+    async def arender(self, tool: Tool, result: Any) -> Any:
+        """
+        Returns the observation to show the model: the result itself if it fits its cap,
+        otherwise a preview and a handle to the spilled whole.
+
+        The store is written from a worker thread, so a large observation does not hold up
+        the other runs sharing the event loop.
+
+        Args:
+            tool (Tool): The tool that produced the result.
+            result (Any): The tool result.
+
+        Returns:
+            Any: The result, or a preview string.
+        """
+        if tool is self.read_tool:
+            return result
+        limit = tool.max_observation_chars if tool.max_observation_chars is not None else self.max_chars
+        text = result if isinstance(result, str) else str(result)
+        if len(text) <= limit:
+            return result
+
+        handle, size = await asyncio.to_thread(self._spill, text)
+        preview = text[:min(self.preview_chars, limit)]
+        # Sizes in UTF-8 bytes, the unit read_observation takes
+        shown = len(preview.encode("utf-8"))
+        return (
+            f"{preview}\n[truncated: bytes 0-{shown} of {size} shown, stored as '{handle}'; "
+            f"call {READ_TOOL_NAME}(handle='{handle}', offset={shown}) to read more]"
+        )
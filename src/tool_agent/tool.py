@@ -1,7 +1,11 @@
 
 from typing import Callable, Dict
+import inspect
 import json
 
+from src.tool_agent.memo import CACHE_POLICIES
+from src.tool_agent.schema import compile_validator, resolve_type_hints, type_name
+
 def get_fn_signatures(fn: Callable) -> Dict:
     """
     Extracts the signature of a given function and formats it into a dictionary.
@@ -14,8 +18,8 @@ def get_fn_signatures(fn: Callable) -> Dict:
             - 'name': The name of the function.
             - 'description': The docstring of the function, if available.
             - 'parameters': A dictionary with:
-                - 'properties': A mapping of argument names to their types (as strings).
-                - 'return_type': The return type of the function, if annotated.
+                - 'properties': A mapping of argument names to their types (as strings) and defaults.
+                - 'required': The names of the arguments without a default.
     """
     
     res = {
@@ -23,54 +27,60 @@ def get_fn_signatures(fn: Callable) -> Dict:
         "description": fn.__doc__,
         "parameters": {
             "properties": {},
+            "required": [],
         }
     }
 
-    # Extract parameters and their types
-    res["parameters"]["properties"] = {
-        k: {"type": v.__name__ if hasattr(v, '__name__') else str(v)}
-        for k, v in fn.__annotations__.items()
-        if k != "return"
-    }
+    # Extract parameters, their types and defaults
+    hints = resolve_type_hints(fn)
+    for name, parameter in inspect.signature(fn).parameters.items():
+        if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        prop = {"type": type_name(hints.get(name, parameter.annotation))}
+        if parameter.default is inspect.Parameter.empty:
+            res["parameters"]["required"].append(name)
+        else:
+            prop["default"] = parameter.default
+        res["parameters"]["properties"][name] = prop
 
     return res
 
 
-def validate_arguments(tool_call: dict, tool_signature: dict) -> dict:
+class Tool:
     """
-    Validates and converts arguments in the input dictionary to match the expected types.
-
-    Args:
-        tool_call (dict): A dictionary containing the arguments passed to the tool.
-        tool_signature (dict): The expected function signature and parameter types.
-
-    Returns:
-        dict: The tool call dictionary with the arguments converted to the correct types if necessary.
+    A function the model can call, together with its JSON signature.
+
+    Attributes:
+        name (str): The tool name the model uses in <tool_call> tags.
+        fn (Callable): The function to execute. May be a coroutine function.
+        fn_signature (str): The function signature in JSON format.
+        signature (dict): The parsed function signature.
+        validate (Callable[[dict], dict]): Checks and converts call arguments, compiled once from `fn`.
+        cpu_bound (bool): Run the tool in a worker process instead of a thread.
+        timeout (float | None): Seconds after which a call is abandoned, or None for no limit.
+        is_async (bool): Whether `fn` is a coroutine function.
+        cache_policy (str): 'pure' (results reused), 'ttl' (reused for `cache_ttl` seconds) or 'never'.
+        cache_ttl (float | None): Seconds a result is reused under the 'ttl' policy.
+        max_observation_chars (int | None): Size above which a result is spilled out of the prompt,
+            overriding the agent's cap, or None to use the agent's.
     """
-    properties = tool_signature["parameters"]["properties"]
-
-    # TODO: This is overly simplified but enough for simple Tools.
-    type_mapping = {
-        "int": int,
-        "str": str,
-        "bool": bool,
-        "float": float,
-    }
-
-    for arg_name, arg_value in tool_call["arguments"].items():
-        expected_type = properties[arg_name].get("type")
-
-        if not isinstance(arg_value, type_mapping[expected_type]):
-            tool_call["arguments"][arg_name] = type_mapping[expected_type](arg_value)
 
-    return tool_call
-
-
-class Tool:
-    def __init__(self,name:str ,fn:Callable , fn_signature:str):
+    def __init__(self,name:str ,fn:Callable , fn_signature:str, cpu_bound:bool = False, timeout:float | None = None, cache_policy:str = "never", cache_ttl:float | None = None, max_observation_chars:int | None = None):
+        if cache_policy not in CACHE_POLICIES:
+            raise ValueError(f"cache must be one of {', '.join(CACHE_POLICIES)}, got '{cache_policy}'")
+        if cache_policy == "ttl" and cache_ttl is None:
+            raise ValueError("cache='ttl' needs a ttl")
         self.name = name
         self.fn = fn
         self.fn_signature = fn_signature
+        self.signature = json.loads(fn_signature)
+        self.validate = compile_validator(fn)
+        self.cpu_bound = cpu_bound
+        self.timeout = timeout
+        self.is_async = inspect.iscoroutinefunction(fn)
+        self.cache_policy = cache_policy
+        self.cache_ttl = cache_ttl if cache_policy == "ttl" else None
+        self.max_observation_chars = max_observation_chars
     
     def __str__(self):
         return self.fn_signature
@@ -79,13 +89,35 @@ class Tool:
         return self.fn(**kwargs)
     
     
-def tool(fn):
-    def wrapper():
+def tool(fn: Callable | None = None, *, cpu_bound: bool = False, timeout: float | None = None, cache: str | None = None, ttl: float | None = None, max_observation_chars: int | None = None):
+    """
+    Turns a function into a Tool. Usable bare (``@tool``) or with options (``@tool(cpu_bound=True)``).
+
+    Args:
+        fn (Callable, optional): The function to wrap.
+        cpu_bound (bool, optional): Run calls in a worker process rather than a thread, for tools that
+            hold the GIL. The function must be defined at module level so workers can import it. Defaults to False.
+        timeout (float, optional): Per-call timeout in seconds. Defaults to None (no limit).
+        cache (str, optional): 'pure' to reuse the result of identical calls (same validated arguments),
+            'ttl' to reuse it for `ttl` seconds, 'never' to always execute. Defaults to 'ttl' when a
+            ttl is given, 'never' otherwise.
+        ttl (float, optional): Seconds a result is reused with cache='ttl'. Defaults to None.
+        max_observation_chars (int, optional): Characters of the result kept in the prompt before it is
+            spilled, when the agent spills observations. Defaults to None (the agent's cap).
+
+    Returns:
+        Tool: The tool, or a decorator producing it when called with options only.
+    """
+    def wrapper(fn):
         fn_sign = get_fn_signatures(fn)
         
-        return Tool(name=fn_sign['name'] , fn=fn,fn_signature=json.dumps(fn_sign))
+        # Defaults that JSON cannot represent are shown by their repr
+        policy = cache if cache is not None else ("ttl" if ttl is not None else "never")
+        return Tool(name=fn_sign['name'] , fn=fn,fn_signature=json.dumps(fn_sign, default=repr),cpu_bound=cpu_bound,timeout=timeout,cache_policy=policy,cache_ttl=ttl,max_observation_chars=max_observation_chars)
     
-    return wrapper()
+    if fn is None:
+        return wrapper
+    return wrapper(fn)
             
 ## Method -1
 # def add(a:int , b:int)->int:
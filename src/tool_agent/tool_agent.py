@@ -1,15 +1,18 @@
 ##  I have to create agent that can use tool and respond to user queries
 
-from src.utils.completions import ChatHistory,generate_response,struct_the_prompt,update_chat_history
-from src.tool_agent.tool import Tool,validate_arguments
-from groq import Groq
-from dotenv import load_dotenv
-import json
-from typing import List
-from colorama import Fore
+from src.utils.completions import ChatHistory,agenerate_response,struct_the_prompt,update_chat_history
+from src.utils.async_runner import iterate_sync, run_sync
+from src.utils.batch import BatchResult, BatchStats, abatch
+from src.utils.cache import ResponseCache
+from src.utils.prompts import join_tool_signatures
+from src.tool_agent.tool import Tool
+from src.tool_agent.tool_executor import ToolExecutor
+from src.tool_agent.spill import ObservationSpiller, SpillStore
+from src.utils.backends import LLMBackend
+from src.utils.llm_client import get_default_client
+from typing import AsyncIterator, Iterable, Iterator, List
 from src.utils.extraction import extract_tag_content
 
-load_dotenv()
 
 TOOL_SYSTEM_PROMPT = """
 You are a function calling AI model. You are provided with function signatures within <tools></tools> XML tags.
@@ -31,25 +34,36 @@ Here are the available tools:
 """
 
 class ToolAgent:
-    def __init__(self,tools:List[Tool] | Tool,model:str = 'llama-3.3-70b-versatile')->None:
-        self.client = Groq()
+    def __init__(self,tools:List[Tool] | Tool,model:str = 'llama-3.3-70b-versatile',cache:ResponseCache | None = None,tool_timeout:float | None = None,max_history_tokens:int | None = None,backend:LLMBackend | None = None,max_observation_chars:int | None = None,spill_store:SpillStore | None = None)->None:
+        # Any LLMBackend works, e.g. an LLMClient with its own limits or an offline ScriptedBackend
+        self.client = backend if backend is not None else get_default_client()
         self.model = model
+        self.cache = cache  # Optional response cache shared with other agents
+        self.max_history_tokens = max_history_tokens  # Approximate token budget of the conversation
         self.tools = tools
+        self.spiller = None  # Keeps observations over max_observation_chars out of the prompt
+        if max_observation_chars is not None:
+            self.spiller = ObservationSpiller(spill_store, max_observation_chars)
+            self.tools = [*self.tools, self.spiller.read_tool]
+        self.max_read_rounds = 10  # Extra tool rounds allowed to page through spilled observations
         self.tools_dict = {f.name : f for f in self.tools}
+        self.tool_executor = ToolExecutor(self.tools, timeout=tool_timeout, spiller=self.spiller)
+        # Built once and shared by every conversation of this agent
+        self.system_message = struct_the_prompt("system",TOOL_SYSTEM_PROMPT % self.add_tool_signatures())
         
     def add_tool_signatures(self) -> str:
         """
         Collects the function signatures of all available tools.
 
         Returns:
-            str: A concatenated string of all tool function signatures in JSON format.
+            str: A concatenated string of all tool function signatures in JSON format, ordered by tool name.
         """
-        return "".join([tool.fn_signature for tool in self.tools])
+        return join_tool_signatures(self.tools)
 
     
-    def process_tool_calls(self, tool_calls_content: list) -> dict:
+    async def aprocess_tool_calls(self, tool_calls_content: list) -> dict:
         """
-        Processes each tool call, validates arguments, executes the tools, and collects results.
+        Validates and executes every tool call concurrently and collects the results.
 
         Args:
             tool_calls_content (list): List of strings, each representing a tool call in JSON format.
@@ -57,56 +71,102 @@ class ToolAgent:
         Returns:
             dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
         """
-        observations = {}
-        for tool_call_str in tool_calls_content:
-            tool_call = json.loads(tool_call_str)
-            tool_name = tool_call["name"]
-            tool = self.tools_dict[tool_name]
+        return await self.tool_executor.arun_calls(tool_calls_content)
 
-            print(Fore.GREEN + f"\nUsing Tool: {tool_name}")
-
-            # Validate and execute the tool call
-            validated_tool_call = validate_arguments(
-                tool_call, json.loads(tool.fn_signature)
-            )
-            print(Fore.GREEN + f"\nTool call dict: \n{validated_tool_call}")
-
-            result = tool.run(**validated_tool_call["arguments"])
-            print(Fore.GREEN + f"\nTool result: \n{result}")
+    def process_tool_calls(self, tool_calls_content: list) -> dict:
+        """
+        Processes each tool call, validates arguments, executes the tools, and collects results.
+        Thin synchronous wrapper around `aprocess_tool_calls`.
 
-            # Store the result using the tool call ID
-            observations[validated_tool_call["id"]] = result
+        Args:
+            tool_calls_content (list): List of strings, each representing a tool call in JSON format.
 
-        return observations
+        Returns:
+            dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
+        """
+        return run_sync(self.aprocess_tool_calls(tool_calls_content))
     
     
-    def run(self,usr_msg:str)->str:
+    async def arun(self,usr_msg:str)->str:
+        """
+        Answers a user message, calling tools if the model asks for them, without blocking the event loop.
+
+        With `max_observation_chars`, the model may keep calling tools (e.g. `read_observation` on a
+        spilled observation) for up to `max_read_rounds` more rounds before its answer.
+
+        Args:
+            usr_msg (str): The user's message.
+
+        Returns:
+            str: The final response from the agent.
+        """
         agent_history = ChatHistory(
             [
-                struct_the_prompt("system",TOOL_SYSTEM_PROMPT % self.add_tool_signatures()),
+                self.system_message,
                 struct_the_prompt("user" , usr_msg)
             ]
-            ,max_length=3)
+            # Paging through a spilled observation needs the earlier pages, within the token budget
+            ,max_length=-1 if self.spiller is not None else 3, pinned=2, max_tokens=self.max_history_tokens)
         
-        llm_response = generate_response(self.client,agent_history,self.model)
+        llm_response = await agenerate_response(self.client,agent_history,self.model,self.cache)
         
         tool_calls = extract_tag_content(str(llm_response), "tool_call")
+        rounds = 0
 
-        if tool_calls.found:
-            observations = self.process_tool_calls(tool_calls.content)
+        while tool_calls.found:
+            observations = await self.aprocess_tool_calls(tool_calls.content)
             update_chat_history(
                 agent_history, struct_the_prompt(role="user",message=f"Observations {observations}")
             )
+            llm_response = await agenerate_response(self.client, agent_history, self.model, self.cache)
+            # Without spilling, one tool round is all the agent does
+            if self.spiller is None or rounds >= self.max_read_rounds:
+                break
+            rounds += 1
+            tool_calls = extract_tag_content(str(llm_response), "tool_call")
 
-        return generate_response(self.client, agent_history, self.model)
-        
-        
-        
-        
-        
-        
-            
-        
-        
-        
-    
\ No newline at end of file
+        return llm_response
+
+    def run(self,usr_msg:str)->str:
+        """
+        Answers a user message. Thin synchronous wrapper around `arun`.
+
+        Args:
+            usr_msg (str): The user's message.
+
+        Returns:
+            str: The final response from the agent.
+        """
+        return run_sync(self.arun(usr_msg))
+
+    async def arun_batch(self, messages: Iterable[str], concurrency: int = 8, stats: BatchStats | None = None) -> AsyncIterator[BatchResult]:
+        """
+        Answers many independent user messages, at most `concurrency` at a time, without blocking the event loop.
+
+        Every conversation shares the agent's system prompt, tool registry and client. To go through
+        a provider batch endpoint, create the agent with ``backend=BatchingBackend(...)``.
+
+        Args:
+            messages (Iterable[str]): The user messages; may be a lazy stream.
+            concurrency (int, optional): Maximum conversations in flight. Defaults to 8.
+            stats (BatchStats | None, optional): Counters updated as results arrive. Defaults to None.
+
+        Yields:
+            BatchResult: The result of each message, as soon as it finishes.
+        """
+        async for result in abatch(self.arun, messages, concurrency, stats):
+            yield result
+
+    def run_batch(self, messages: Iterable[str], concurrency: int = 8, stats: BatchStats | None = None) -> Iterator[BatchResult]:
+        """
+        Answers many independent user messages concurrently. Synchronous counterpart of `arun_batch`.
+
+        Args:
+            messages (Iterable[str]): The user messages; may be a lazy stream.
+            concurrency (int, optional): Maximum conversations in flight. Defaults to 8.
+            stats (BatchStats | None, optional): Counters updated as results arrive. Defaults to None.
+
+        Yields:
+            BatchResult: The result of each message, as soon as it finishes.
+        """
+        return iterate_sync(self.arun_batch(messages, concurrency, stats))
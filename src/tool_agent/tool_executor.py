@@ -0,0 +1,177 @@
+import asyncio
+import importlib
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from src.tool_agent.memo import ToolMemo, get_tool_memo
+from src.tool_agent.spill import ObservationSpiller
+from src.tool_agent.tool import Tool
+from src.utils.async_runner import spawn_context
+from src.utils.cassette import CassetteMiss, get_active_cassette
+from src.utils.logging import Fore
+from src.utils.telemetry import tracer
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Returns the process pool shared by every cpu-bound tool, creating it on first use."""
+    global _process_pool
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(mp_context=spawn_context())
+    return _process_pool
+
+
+def _call_in_process(module: str, qualname: str, kwargs: dict):
+    """
+    Imports a tool by its module and qualified name and calls it inside a worker process.
+
+    The `@tool` decorator replaces the function with a Tool object, so the function itself
+    cannot be pickled by reference; the worker imports the module and unwraps the Tool instead.
+    """
+    target = importlib.import_module(module)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    fn = target.fn if isinstance(target, Tool) else target
+    return fn(**kwargs)
+
+
+class ToolExecutor:
+    """
+    Executes the tool calls emitted by the model concurrently.
+
+    Async tools run as coroutines on the event loop, tools declared with ``cpu_bound=True``
+    run in a shared process pool and every other tool runs on the loop's thread pool.
+    A failing or timed-out call becomes an error observation instead of aborting the turn.
+    Results of tools declared cacheable are reused through a ToolMemo. While a Cassette is
+    active, calls are recorded to it, or answered from it without running the tool.
+
+    Args:
+        tools (List[Tool]): The tools the model may call.
+        timeout (float | None): Default per-call timeout in seconds, used when a tool does not set its own.
+        memo (ToolMemo | None): Memo of cacheable tool results. Defaults to the process-wide shared one.
+        spiller (ObservationSpiller | None): Replaces results over their size cap with a preview and a
+            handle. Its `read_observation` tool is added to the tools. Defaults to None (results kept whole).
+    """
+
+    def __init__(self, tools: List[Tool], timeout: float | None = None, memo: ToolMemo | None = None, spiller: ObservationSpiller | None = None):
+        self.tools_dict = {t.name: t for t in tools}
+        self.timeout = timeout
+        self.memo = memo if memo is not None else get_tool_memo()
+        self.spiller = spiller
+        if spiller is not None:
+            self.tools_dict[spiller.read_tool.name] = spiller.read_tool
+
+    async def _dispatch(self, tool: Tool, arguments: dict):
+        if tool.is_async:
+            return await tool.fn(**arguments)
+
+        if tool.cpu_bound and "<locals>" not in tool.fn.__qualname__:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                _get_process_pool(), _call_in_process, tool.fn.__module__, tool.fn.__qualname__, arguments
+            )
+
+        return await asyncio.to_thread(tool.run, **arguments)
+
+    def _timeout_for(self, tool: Tool) -> float | None:
+        return tool.timeout if tool.timeout is not None else self.timeout
+
+    async def arun_memoized(self, tool: Tool, arguments: dict) -> tuple:
+        """
+        Runs a tool on validated arguments through the memo, with its timeout.
+
+        Args:
+            tool (Tool): The tool.
+            arguments (dict): The validated arguments.
+
+        Returns:
+            tuple: The result, and whether it came from the memo (or from an identical running call).
+        """
+        return await self.memo.arun(
+            tool, arguments, lambda: asyncio.wait_for(self._dispatch(tool, arguments), self._timeout_for(tool))
+        )
+
+    async def _render(self, tool: Tool, result):
+        # Recorded, memoized and replayed results stay whole; only the prompt gets the preview
+        return await self.spiller.arender(tool, result) if self.spiller is not None else result
+
+    async def arun_call(self, tool_call_str: str, index: int = 0) -> tuple:
+        """
+        Validates and executes a single tool call.
+
+        Args:
+            tool_call_str (str): The tool call in JSON format.
+            index (int, optional): Position of the call in the turn, used as its ID when the model omitted one.
+
+        Returns:
+            tuple: The tool call ID and the tool result (or an error message).
+        """
+        try:
+            tool_call = json.loads(tool_call_str)
+        except json.JSONDecodeError as e:
+            return index, f"Error: invalid tool call JSON: {e}"
+        if not isinstance(tool_call, dict):
+            return index, f"Error: a tool call must be a JSON object, got {type(tool_call).__name__}"
+
+        call_id = tool_call.get("id", index)
+        tool_name = tool_call.get("name")
+        tool = self.tools_dict.get(tool_name)
+        if tool is None:
+            return call_id, f"Error: unknown tool '{tool_name}'"
+
+        print(Fore.GREEN + f"\nUsing Tool: {tool_name}")
+
+        timeout = self._timeout_for(tool)
+        cassette = get_active_cassette()
+        start = time.perf_counter()
+        with tracer.span("tool.call", tool=tool_name, call_id=call_id) as span:
+            try:
+                if cassette is not None and cassette.replaying:
+                    result = cassette.replay_tool(tool_name, tool_call.get("arguments", {}))
+                    span.set("replayed", True)
+                    print(Fore.GREEN + f"\nTool result (replayed): \n{result}")
+                    return call_id, await self._render(tool, result)
+
+                # Validate and execute the tool call with the validator compiled by @tool
+                arguments = tool.validate(tool_call.get("arguments", {}))
+                print(Fore.GREEN + f"\nTool call dict: \n{ {**tool_call, 'arguments': arguments} }")
+
+                result, cache_hit = await self.arun_memoized(tool, arguments)
+                span.set("cache_hit", cache_hit)
+            except CassetteMiss:
+                raise
+            except asyncio.TimeoutError:
+                result = f"Error: {tool_name} timed out after {timeout}s"
+                span.set("error", "timeout")
+            except Exception as e:
+                result = f"Error: {type(e).__name__}: {e}"
+                span.set("error", type(e).__name__)
+
+        if cassette is not None:
+            cassette.record_tool(tool_name, tool_call.get("arguments", {}), result, time.perf_counter() - start)
+        result = await self._render(tool, result)
+        print(Fore.GREEN + f"\nTool result: \n{result}")
+        return call_id, result
+
+    async def arun_calls(self, tool_calls_content: list) -> dict:
+        """
+        Executes all tool calls of a turn concurrently.
+
+        Args:
+            tool_calls_content (list): List of strings, each representing a tool call in JSON format.
+
+        Returns:
+            dict: A dictionary where the keys are tool call IDs and values are the results from the tools,
+            in the order the calls were emitted.
+        """
+        results = await asyncio.gather(
+            *(self.arun_call(tool_call_str, index) for index, tool_call_str in enumerate(tool_calls_content))
+        )
+        return dict(results)
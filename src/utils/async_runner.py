@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+# The synchronous APIs run their coroutines on one long-lived event loop in a daemon thread
+# instead of calling asyncio.run() each time. Async clients keep connection pools that are bound
+# to the loop that opened them, so a single loop lets every sync call reuse the same connections.
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: threading.Thread | None = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the shared background event loop, starting it on first use.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running background loop.
+    """
+    global _loop, _loop_thread
+
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="agentic-patterns-loop", daemon=True
+            )
+            _loop_thread.start()
+    return _loop
+
+
+def spawn_context():
+    """
+    Returns the multiprocessing context for the framework's worker processes.
+
+    Workers are spawned rather than forked: a forked child would inherit the background event
+    loop above without the thread running it, and hang on its first synchronous call.
+
+    Returns:
+        multiprocessing.context.SpawnContext: The "spawn" context.
+    """
+    return multiprocessing.get_context("spawn")
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a coroutine to completion on the background loop and returns its result.
+
+    Args:
+        coro (Coroutine): The coroutine to run.
+
+    Returns:
+        The value returned by the coroutine.
+
+    Raises:
+        RuntimeError: If called from the background loop itself, where blocking would deadlock.
+    """
+    loop = get_background_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the event loop thread; await the coroutine instead.")
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iterate_sync(iterator: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterates an async iterator from synchronous code, one item at a time, on the background loop.
+
+    Leaving the loop early closes the async iterator.
+
+    Args:
+        iterator (AsyncIterator): E.g. an async generator.
+
+    Yields:
+        The items of the async iterator.
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            run_sync(aclose())
@@ -0,0 +1,256 @@
+import asyncio
+import inspect
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Optional, Protocol, Sequence, runtime_checkable
+
+from src.utils.lazy import LazyImport, load_env
+from src.utils.tokens import estimate_message_tokens, estimate_tokens
+
+# The provider SDK takes a few hundred milliseconds to import; only GroqBackend needs it
+groq = LazyImport("groq")
+
+
+@dataclass
+class Completion:
+    """
+    A finished completion and its token usage.
+
+    Attributes:
+        content (str): The text generated by the model.
+        prompt_tokens (int): Tokens in the request.
+        completion_tokens (int): Tokens in the generated text.
+    """
+
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class TransientBackendError(Exception):
+    """
+    A failure worth retrying (rate limit, overload, dropped connection).
+
+    Args:
+        message (str): Description of the failure.
+        retry_after (Optional[float]): Seconds the provider asked to wait, if any.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@runtime_checkable
+class LLMBackend(Protocol):
+    """
+    What agents need from an LLM provider.
+
+    Implementations raise TransientBackendError for failures worth retrying and any other
+    exception for permanent ones.
+    """
+
+    async def complete(self, messages: Sequence, model: str, **params) -> Completion:
+        """Returns the whole completion for a request."""
+        ...
+
+    def stream(self, messages: Sequence, model: str, **params) -> AsyncIterator[str]:
+        """Yields the completion text piece by piece as it is generated."""
+        ...
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _translate_error(error: Exception) -> Exception:
+    if isinstance(error, groq.APIConnectionError):
+        return TransientBackendError(str(error))
+    status = getattr(error, "status_code", None)
+    if status is not None and (status in (408, 409, 429) or status >= 500):
+        return TransientBackendError(str(error), _retry_after(error))
+    return error
+
+
+def _default_groq_client():
+    load_env()  # GROQ_API_KEY may come from .env
+    return groq.AsyncGroq(max_retries=0)
+
+
+class GroqBackend:
+    """
+    Backend for Groq, or any client exposing the OpenAI-style ``chat.completions.create``.
+
+    Without an explicit `client`, one AsyncGroq is built per event loop (HTTP connection pools
+    are bound to the loop that opened them) with the SDK's own retries disabled.
+
+    Synchronous clients (e.g. ``groq.Groq``) are accepted too: their requests and stream reads
+    run in worker threads, so they do not block the event loop.
+
+    Args:
+        client: A provider client to use on every loop.
+        client_factory (Optional[Callable]): Builds a provider client. Defaults to AsyncGroq(max_retries=0).
+    """
+
+    def __init__(self, client=None, client_factory: Optional[Callable] = None):
+        self.client = client
+        self.client_factory = client_factory or _default_groq_client
+        self._clients = weakref.WeakKeyDictionary()  # event loop -> provider client
+        self._lock = threading.Lock()
+
+    def _provider(self):
+        if self.client is not None:
+            return self.client
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = self.client_factory()
+        return client
+
+    async def _create(self, **kwargs):
+        create = self._provider().chat.completions.create
+        try:
+            if inspect.iscoroutinefunction(create):
+                return await create(**kwargs)
+            # A synchronous client: its blocking request goes to a worker thread
+            response = await asyncio.to_thread(create, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+            return response
+        except Exception as e:
+            raise _translate_error(e) from e
+
+    async def complete(self, messages: Sequence, model: str, **params) -> Completion:
+        response = await self._create(model=model, messages=messages, **params)
+        usage = getattr(response, "usage", None)
+        return Completion(
+            content=response.choices[0].message.content,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+        )
+
+    async def stream(self, messages: Sequence, model: str, **params) -> AsyncIterator[str]:
+        stream = await self._create(model=model, messages=messages, stream=True, **params)
+        if not hasattr(stream, "__aiter__"):
+            async for piece in self._sync_stream(stream):
+                yield piece
+            return
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+    async def _sync_stream(self, stream) -> AsyncIterator[str]:
+        # Each read of a synchronous stream may block on the network, so it runs in a worker thread
+        chunks = iter(stream)
+        done = object()
+        try:
+            while (chunk := await asyncio.to_thread(next, chunks, done)) is not done:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await asyncio.to_thread(close)
+
+
+class ScriptedBackend:
+    """
+    Offline, deterministic stand-in for an LLM provider, for tests, benchmarks and load tests.
+
+    Responses come from a script: a list of strings replayed in order (cycling when exhausted),
+    or a function of the messages. Latency, generation speed and failures are simulated with a
+    seeded random generator, so two runs with the same seed behave the same.
+
+    Args:
+        responses (list[str] | Callable): Responses to replay, or ``fn(messages, model) -> str``.
+        latency (float): Seconds before the first token. Defaults to 0.
+        tokens_per_second (Optional[float]): Generation speed. Defaults to None (instant).
+        failure_rate (float): Probability that a call raises TransientBackendError. Defaults to 0.
+        seed (int): Seed of the random generator used for failures. Defaults to 0.
+        chunk_tokens (int): Approximate tokens per streamed piece. Defaults to 4.
+    """
+
+    def __init__(
+        self,
+        responses: "list[str] | Callable[[Sequence, str], str]",
+        latency: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        chunk_tokens: int = 4,
+    ):
+        self.responses = responses
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.chunk_tokens = chunk_tokens
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_response(self, messages: Sequence, model: str) -> str:
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+        if failed:
+            raise TransientBackendError("Simulated provider failure")
+        if callable(self.responses):
+            return self.responses(messages, model)
+        return self.responses[index % len(self.responses)]
+
+    async def complete(self, messages: Sequence, model: str, **params) -> Completion:
+        content = self._next_response(messages, model)
+        completion_tokens = estimate_tokens(content)
+
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return Completion(content, estimate_message_tokens(messages), completion_tokens)
+
+    async def stream(self, messages: Sequence, model: str, **params) -> AsyncIterator[str]:
+        content = self._next_response(messages, model)
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        step = self.chunk_tokens * 4
+        for start in range(0, len(content), step):
+            if self.tokens_per_second:
+                await asyncio.sleep(self.chunk_tokens / self.tokens_per_second)
+            yield content[start:start + step]
@@ -0,0 +1,302 @@
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Protocol, Sequence
+
+from src.utils.backends import Completion, TransientBackendError, groq
+from src.utils.lazy import load_env
+from src.utils.logging import Fore
+
+
+@dataclass
+class BatchResult:
+    """
+    The outcome of one message of a batch.
+
+    Attributes:
+        index (int): Position of the message in the batch.
+        message (str): The user message.
+        output (Optional[str]): The agent's answer, or None if it failed.
+        error (Optional[str]): The failure, or None if it succeeded.
+        seconds (float): Wall-clock time spent on the message.
+    """
+
+    index: int
+    message: str
+    output: Optional[str]
+    error: Optional[str]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchStats:
+    """
+    Live counters of a batch run, updated as results come in.
+
+    Attributes:
+        completed (int): Messages answered.
+        failed (int): Messages whose run raised.
+        started_at (float): perf_counter() value when the batch started.
+        finished_at (Optional[float]): perf_counter() value when the batch finished.
+    """
+
+    completed: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Messages finished per second so far."""
+        elapsed = self.elapsed
+        return (self.completed + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def record(self, result: BatchResult) -> None:
+        if result.ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+
+async def abatch(
+    run: Callable[[str], Awaitable[str]],
+    messages: Iterable[str],
+    concurrency: int = 8,
+    stats: Optional[BatchStats] = None,
+) -> AsyncIterator[BatchResult]:
+    """
+    Runs `run` over many messages, at most `concurrency` at a time, yielding results as they finish.
+
+    Messages are pulled from the iterable only when a slot frees up, so it may be a lazy stream
+    of any length. A failing message becomes a result with an error instead of stopping the batch.
+
+    Args:
+        run (Callable[[str], Awaitable[str]]): The coroutine function answering one message, e.g. an agent's `arun`.
+        messages (Iterable[str]): The user messages.
+        concurrency (int, optional): Maximum messages in flight. Defaults to 8.
+        stats (Optional[BatchStats]): Counters updated as results arrive, to monitor throughput. Defaults to None.
+
+    Yields:
+        BatchResult: The result of each message, in completion order (see `BatchResult.index`).
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    stats = stats if stats is not None else BatchStats()
+    stats.started_at = time.perf_counter()
+    pending = enumerate(messages)
+    running = set()
+
+    async def timed_run(index: int, message: str) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            output, error = await run(message), None
+        except Exception as e:
+            output, error = None, f"{type(e).__name__}: {e}"
+        return BatchResult(index, message, output, error, time.perf_counter() - start)
+
+    def refill():
+        for index, message in itertools.islice(pending, concurrency - len(running)):
+            running.add(asyncio.ensure_future(timed_run(index, message)))
+
+    try:
+        refill()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            running.difference_update(done)
+            # Keep the window full while the caller handles the results
+            refill()
+            for task in done:
+                result = task.result()
+                stats.record(result)
+                yield result
+    finally:
+        for task in running:
+            task.cancel()
+        stats.finished_at = time.perf_counter()
+        # Also reported when the caller stops iterating early
+        print(
+            Fore.YELLOW + f"Batch finished: {stats.completed} completed, {stats.failed} failed "
+            f"in {stats.elapsed:.2f}s ({stats.throughput:.2f} messages/s)"
+        )
+
+
+class BatchSubmitter(Protocol):
+    """Sends many independent chat completion requests at once, e.g. through a provider batch endpoint."""
+
+    async def submit(self, requests: list[dict]) -> list["Completion | Exception"]:
+        """
+        Args:
+            requests (list[dict]): Chat completion bodies ({"model", "messages", **params}).
+
+        Returns:
+            list[Completion | Exception]: One entry per request, in order: its completion or its failure.
+        """
+        ...
+
+
+class LocalBatchSubmitter:
+    """
+    Stand-in for a provider batch endpoint that answers the requests with any LLM backend.
+
+    Args:
+        backend: The backend answering each request, e.g. a ScriptedBackend in tests.
+        concurrency (int): Requests sent at the same time. Defaults to 16.
+    """
+
+    def __init__(self, backend, concurrency: int = 16):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.batches = 0  # Number of batches submitted, for inspection
+
+    async def submit(self, requests: list[dict]) -> list["Completion | Exception"]:
+        self.batches += 1
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def answer(request: dict):
+            params = dict(request)
+            model, messages = params.pop("model"), params.pop("messages")
+            async with semaphore:
+                return await self.backend.complete(messages, model, **params)
+
+        return list(await asyncio.gather(*(answer(request) for request in requests), return_exceptions=True))
+
+
+class GroqBatchSubmitter:
+    """
+    Submits requests through the Groq Batch API: uploads a JSONL file, creates a batch job,
+    polls until it ends and downloads the results.
+
+    Batch jobs trade latency (up to `completion_window`) for cost and rate limits, so this is
+    meant for offline bulk work.
+
+    Args:
+        client (Optional[groq.AsyncGroq]): The provider client. Defaults to AsyncGroq().
+        poll_interval (float): Seconds between status checks. Defaults to 30.
+        completion_window (str): How long the provider may take. Defaults to "24h".
+    """
+
+    _FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client=None, poll_interval: float = 30.0, completion_window: str = "24h"):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    async def _lines(self, file_id: Optional[str]) -> list[dict]:
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in (await content.text()).splitlines() if line.strip()]
+
+    async def submit(self, requests: list[dict]) -> list["Completion | Exception"]:
+        if self.client is None:
+            load_env()
+            self.client = groq.AsyncGroq()
+
+        payload = "\n".join(
+            json.dumps({"custom_id": str(index), "method": "POST", "url": "/v1/chat/completions", "body": request})
+            for index, request in enumerate(requests)
+        )
+        file = await self.client.files.create(file=("batch.jsonl", payload.encode("utf-8")), purpose="batch")
+        batch = await self.client.batches.create(
+            completion_window=self.completion_window, endpoint="/v1/chat/completions", input_file_id=file.id
+        )
+        while batch.status not in self._FINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+
+        results: list = [TransientBackendError(f"Batch {batch.id} ended with status '{batch.status}'")] * len(requests)
+        for line in await self._lines(batch.output_file_id) + await self._lines(getattr(batch, "error_file_id", None)):
+            index = int(line["custom_id"])
+            response = line.get("response") or {}
+            body = response.get("body") or {}
+            if line.get("error") or response.get("status_code", 200) >= 400 or not body.get("choices"):
+                results[index] = RuntimeError(f"Batch request failed: {line.get('error') or body}")
+                continue
+            usage = body.get("usage") or {}
+            results[index] = Completion(
+                content=body["choices"][0]["message"]["content"],
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+            )
+        return results
+
+
+class BatchingBackend:
+    """
+    LLM backend that groups the completion requests made at about the same time into batches.
+
+    Concurrent conversations (e.g. ``agent.run_batch(..., concurrency=500)``) each call `complete`;
+    requests are held for up to `max_wait` seconds, or until `max_batch_size` are waiting, and
+    sent together through the submitter. Streaming is emulated with a single piece. Call
+    `aclose` before dropping the backend to wait for the batches still being submitted.
+
+    Args:
+        submitter (BatchSubmitter): Sends the batches, e.g. GroqBatchSubmitter or LocalBatchSubmitter.
+        max_batch_size (int): Requests per batch. Defaults to 100.
+        max_wait (float): Seconds the first request of a batch waits for others. Defaults to 0.05.
+    """
+
+    def __init__(self, submitter: BatchSubmitter, max_batch_size: int = 100, max_wait: float = 0.05):
+        self.submitter = submitter
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = []  # (request, future) waiting for the next batch
+        self._timer = None
+        self._submissions = set()  # Running _submit tasks, kept so they are not garbage collected
+
+    async def complete(self, messages: Sequence, model: str, **params) -> Completion:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(({"model": model, "messages": list(messages), **params}, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def stream(self, messages: Sequence, model: str, **params) -> AsyncIterator[str]:
+        completion = await self.complete(messages, model, **params)
+        yield completion.content
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._submit(batch))
+            self._submissions.add(task)
+            task.add_done_callback(self._submissions.discard)
+
+    async def aclose(self) -> None:
+        """Sends the requests still waiting for a batch and waits for every submitted batch to finish."""
+        self._flush()
+        await asyncio.gather(*self._submissions, return_exceptions=True)
+
+    async def _submit(self, batch: list) -> None:
+        try:
+            results = await self.submitter.submit([request for request, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # The caller was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def make_cache_key(model: str, messages: list, **params) -> str:
+    """
+    Builds a stable, content-addressed key for an LLM request.
+
+    Args:
+        model (str): The model name.
+        messages (list): The message dictionaries sent to the model.
+        **params: Sampling parameters (temperature, max_tokens, ...) that affect the output.
+
+    Returns:
+        str: The SHA-256 hex digest of the canonical JSON form of the request.
+    """
+    payload = json.dumps(
+        {"model": model, "messages": list(messages), "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """
+    Hit / miss counters of a cache. Update them with `record`, which is thread safe.
+
+    Attributes:
+        hits (int): Number of lookups that found a value.
+        misses (int): Number of lookups that found nothing (or an expired value).
+    """
+
+    hits: int = 0
+    misses: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def record(self, hit: bool) -> None:
+        """Counts one lookup as a hit or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """
+    Base class for response caches. Subclasses implement `_get`, `_set` and `clear`.
+
+    A single instance can be shared by any number of agents; all backends are thread safe.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Looks up a key and records the hit or miss.
+
+        Args:
+            key (str): The cache key, usually from `make_cache_key`.
+
+        Returns:
+            Optional[str]: The cached value, or None if absent or expired.
+        """
+        value = self._get(key)
+        self.stats.record(value is not None)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Stores a value under a key.
+
+        Args:
+            key (str): The cache key.
+            value (str): The value to store.
+        """
+        self._set(key, value)
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """
+    In-process cache with least-recently-used eviction and an optional time to live.
+
+    Args:
+        max_size (int): Maximum number of entries kept. Defaults to 1024.
+        ttl (Optional[float]): Seconds after which an entry expires. Defaults to None (never).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(ResponseCache):
+    """
+    On-disk cache stored in a SQLite database, shareable between processes.
+
+    Entries are evicted least-recently-used first once `max_size` is exceeded, and
+    ignored once they are older than `ttl`.
+
+    Args:
+        path (str): Path of the database file.
+        max_size (Optional[int]): Maximum number of entries kept. Defaults to None (no limit).
+        ttl (Optional[float]): Seconds after which an entry expires. Defaults to None (never).
+    """
+
+    def __init__(self, path: str, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, stored_at = row
+            if self.ttl is not None and now - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            if self.max_size is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.max_size is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._conn.close()
@@ -0,0 +1,318 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+from src.utils.backends import Completion
+from src.utils.cache import make_cache_key
+from src.utils.llm_client import LLMError
+from src.utils.logging import Fore
+from src.utils.tokens import message_content
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+
+# Parameters that change how a request is sent, not what the model answers
+_TRANSPORT_PARAMS = frozenset({"stream", "timeout", "user"})
+_PREVIEW_CHARS = 200
+
+
+class CassetteMiss(LookupError):
+    """Raised on replay when a request has no recorded counterpart (always in strict mode)."""
+
+
+@dataclass
+class Divergence:
+    """
+    A request made on replay that does not match the recording.
+
+    Attributes:
+        kind (str): "llm" or "tool".
+        position (int): Index of the request among the replayed requests of its kind.
+        key (str): Normalized hash of the request.
+        detail (str): What was asked, and what the recording held at that position.
+    """
+
+    kind: str
+    position: int
+    key: str
+    detail: str
+
+
+def _normalize_text(text: Any) -> Any:
+    # Whitespace differences (trailing newlines, indentation of templates) do not change the request
+    return " ".join(text.split()) if isinstance(text, str) else text
+
+
+def llm_request_key(model: str, messages: Sequence, **params) -> str:
+    """
+    Hashes an LLM request after normalization: only roles and contents count, whitespace is
+    collapsed and transport parameters (stream, timeout, user) are ignored.
+
+    Args:
+        model (str): The model name.
+        messages (Sequence): The message dictionaries.
+        **params: Sampling parameters.
+
+    Returns:
+        str: The SHA-256 hex digest of the normalized request.
+    """
+    normalized = [
+        {"role": m.get("role") if isinstance(m, dict) else None, "content": _normalize_text(message_content(m))}
+        for m in messages
+    ]
+    params = {name: value for name, value in params.items() if name not in _TRANSPORT_PARAMS}
+    return make_cache_key(model, normalized, kind="cassette", **params)
+
+
+def tool_request_key(tool_name: str, arguments: Any) -> str:
+    """
+    Hashes a tool invocation: the tool name and the arguments emitted by the model.
+
+    Args:
+        tool_name (str): The tool name.
+        arguments (Any): The arguments, as parsed from the tool call.
+
+    Returns:
+        str: The SHA-256 hex digest of the invocation.
+    """
+    return make_cache_key(tool_name, [], kind="cassette_tool", arguments=arguments)
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def _preview(messages: Sequence) -> str:
+    content = message_content(messages[-1]) if messages else ""
+    # The end of the message: prompts put their per-call part last
+    return _normalize_text(content)[-_PREVIEW_CHARS:]
+
+
+_active: Optional["Cassette"] = None
+_active_lock = threading.Lock()
+
+
+def get_active_cassette() -> Optional["Cassette"]:
+    """Returns the cassette activated with ``with cassette:``, or None."""
+    return _active
+
+
+class Cassette:
+    """
+    Records the LLM requests and tool invocations of a run to a JSON Lines file, and replays them.
+
+    While a cassette is active (``with cassette:``), every `generate_response` / `astream_response`
+    call and every tool call made through a ToolExecutor goes through it:
+
+    - "record" mode calls the real backend and tools, and appends one compact line per request
+      (its normalized hash, a preview of the last message, the answer and its duration).
+    - "replay" mode never calls the backend or the tools. Requests are matched on their normalized
+      hash; a request with no recorded match is reported in `divergences` and answered with the
+      next unused recording of its kind, or raises CassetteMiss when `strict` or nothing is left.
+
+    Replays run with no network and next to no latency, so they measure the framework's own
+    overhead on real traces. The cassette is process-wide: one is active at a time, and runs
+    handed to QueueExecutor worker processes are not captured.
+
+    Args:
+        path (str): The cassette file. Recording overwrites it.
+        mode (str): "record" or "replay". Defaults to "replay".
+        strict (bool): Raise CassetteMiss on the first divergence instead of carrying on. Defaults to False.
+
+    Example:
+        >>> with Cassette("runs/crew.jsonl", mode="record"):
+        ...     crew.run()
+        >>> with Cassette("runs/crew.jsonl") as cassette:
+        ...     crew.run()
+        >>> cassette.divergences
+        []
+    """
+
+    def __init__(self, path: str, mode: str = "replay", strict: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self.divergences: list[Divergence] = []
+        self._file = None
+        self._lock = threading.Lock()
+        self._keyed = {"llm": {}, "tool": {}}  # kind -> key -> deque of unused entries
+        self._ordered = {"llm": deque(), "tool": deque()}  # kind -> entries in recording order
+        self._positions = {"llm": 0, "tool": 0}  # Requests replayed so far, per kind
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def __enter__(self) -> "Cassette":
+        global _active
+
+        with _active_lock:
+            if _active is not None:
+                raise RuntimeError("Another cassette is already active")
+            _active = self
+        try:
+            if self.replaying:
+                self._load()
+            else:
+                self._file = open(self.path, "w", encoding="utf-8")
+                self._write({"kind": "header", "version": CASSETTE_VERSION, "created_at": time.time()})
+        except BaseException:
+            with _active_lock:
+                _active = None
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _active
+
+        with _active_lock:
+            _active = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.replaying and (self.divergences or self.unused()):
+            print(Fore.YELLOW + self.summary())
+
+    # Recording
+
+    def _write(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:  # Closed: a call outlived the `with` block
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def record_llm(
+        self,
+        model: str,
+        messages: Sequence,
+        params: dict,
+        completion: Optional[Completion] = None,
+        error: Optional[str] = None,
+        seconds: float = 0.0,
+    ) -> None:
+        """Appends an LLM request and its completion (or its failure) to the cassette."""
+        entry = {
+            "kind": "llm",
+            "key": llm_request_key(model, messages, **params),
+            "model": model,
+            "message_count": len(messages),
+            "last": _preview(messages),
+            "seconds": round(seconds, 6),
+        }
+        if completion is not None:
+            entry.update(
+                content=completion.content,
+                prompt_tokens=completion.prompt_tokens,
+                completion_tokens=completion.completion_tokens,
+            )
+        else:
+            entry["error"] = error
+        self._write(entry)
+
+    def record_tool(self, tool_name: str, arguments: Any, result: Any, seconds: float = 0.0) -> None:
+        """Appends a tool invocation and its result (or error observation) to the cassette."""
+        self._write({
+            "kind": "tool",
+            "key": tool_request_key(tool_name, arguments),
+            "tool": tool_name,
+            "arguments": _jsonable(arguments),
+            "result": _jsonable(result),
+            "seconds": round(seconds, 6),
+        })
+
+    # Replaying
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                kind = entry.get("kind")
+                if kind == "header":
+                    if entry.get("version") != CASSETTE_VERSION:
+                        raise ValueError(f"Unsupported cassette version {entry.get('version')!r}")
+                    continue
+                entry["used"] = False
+                self._keyed[kind].setdefault(entry["key"], deque()).append(entry)
+                self._ordered[kind].append(entry)
+
+    def _take(self, kind: str, key: str, description: str) -> dict:
+        with self._lock:
+            position = self._positions[kind]
+            self._positions[kind] += 1
+
+            matches = self._keyed[kind].get(key)
+            while matches and matches[0]["used"]:
+                matches.popleft()
+            if matches:
+                entry = matches.popleft()
+                entry["used"] = True
+                return entry
+
+            # No recording of this exact request: fall back to the next unused one of its kind
+            ordered = self._ordered[kind]
+            while ordered and ordered[0]["used"]:
+                ordered.popleft()
+            recorded = ordered[0] if ordered else None
+            expected = recorded.get("last") or recorded.get("tool") if recorded else "nothing"
+            divergence = Divergence(kind, position, key, f"requested {description!r}, recording has {expected!r}")
+            self.divergences.append(divergence)
+            missed = self.strict or recorded is None
+            if not missed:
+                recorded["used"] = True
+
+        print(Fore.YELLOW + f"\nCassette divergence ({kind} #{position}): {divergence.detail}")
+        if missed:
+            raise CassetteMiss(f"No recorded {kind} request matches #{position}: {divergence.detail}")
+        return recorded
+
+    def replay_llm(self, model: str, messages: Sequence, params: dict) -> Completion:
+        """
+        Returns the recorded completion of an LLM request.
+
+        Raises:
+            CassetteMiss: If nothing matches and the cassette is strict, or nothing is left.
+            LLMError: If the recorded request failed.
+        """
+        entry = self._take("llm", llm_request_key(model, messages, **params), _preview(messages))
+        if "error" in entry:
+            raise LLMError(entry["error"])
+        return Completion(entry["content"], entry.get("prompt_tokens", 0), entry.get("completion_tokens", 0))
+
+    def replay_tool(self, tool_name: str, arguments: Any) -> Any:
+        """
+        Returns the recorded result of a tool invocation.
+
+        Raises:
+            CassetteMiss: If nothing matches and the cassette is strict, or nothing is left.
+        """
+        return self._take("tool", tool_request_key(tool_name, arguments), tool_name)["result"]
+
+    def unused(self) -> dict:
+        """Number of recorded requests not replayed, per kind."""
+        return {
+            kind: count
+            for kind, entries in self._ordered.items()
+            if (count := sum(1 for entry in entries if not entry["used"]))
+        }
+
+    def summary(self) -> str:
+        """One-line report of the replay: requests served, divergences and leftovers."""
+        unused = self.unused()
+        leftovers = ", ".join(f"{count} {kind}" for kind, count in unused.items()) or "none"
+        return (
+            f"Cassette {self.path}: replayed {self._positions['llm']} LLM and {self._positions['tool']} tool "
+            f"requests, {len(self.divergences)} divergence(s), unused recordings: {leftovers}"
+        )
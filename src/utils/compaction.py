@@ -0,0 +1,115 @@
+import asyncio
+from typing import Any, Optional
+
+from src.utils.cache import ResponseCache
+from src.utils.completions import ChatHistory, agenerate_response, struct_the_prompt
+from src.utils.logging import Fore
+
+SUMMARY_SYSTEM_PROMPT = """
+You maintain a running summary of an agent's earlier work. You receive the current summary
+enclosed in <summary></summary> tags and older messages that no longer fit in the agent's context
+enclosed in <messages></messages> tags. Merge them into a single updated summary.
+Keep every fact, tool result, decision and open question the agent may still need; drop repetition.
+Keep the summary under %d words and output only the summary text.
+"""
+
+
+class HistoryCompactor:
+    """
+    Folds messages evicted from a ChatHistory into a running summary kept in its pinned prefix.
+
+    Evicted messages are buffered and only summarized once they exceed `threshold_tokens`.
+    Summarization runs as a background task: `maybe_compact` starts it without waiting, and
+    `install` puts the finished summary into the history before a later LLM call. The agent
+    loop therefore never waits on the summarizer. If a summarization fails, its messages go
+    back to the buffer and are summarized with the next batch.
+
+    Args:
+        client: The async LLM client used to write the summary.
+        model (str): The model name used for summarization.
+        threshold_tokens (int): Approximate size of evicted text that triggers a compaction. Defaults to 1024.
+        max_summary_words (int): Length limit given to the summarizer. Defaults to 250.
+        cache (Optional[ResponseCache]): Optional response cache for summarization calls.
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        threshold_tokens: int = 1024,
+        max_summary_words: int = 250,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.threshold_tokens = threshold_tokens
+        self.max_summary_words = max_summary_words
+        self.cache = cache
+        self.summary = ""
+        self._history: Optional[ChatHistory] = None
+        self._slot: Optional[int] = None
+        self._pending: list = []
+        self._pending_tokens = 0
+        self._task: Optional[asyncio.Task] = None
+        self._summarizing: tuple = ([], 0)  # Messages being summarized by `_task`, and their tokens
+
+    def attach(self, history: ChatHistory) -> None:
+        """
+        Starts collecting the messages evicted from a history.
+
+        Args:
+            history (ChatHistory): The history to compact. It needs a `max_length` or `max_tokens` to evict anything.
+        """
+        self._history = history
+        history.on_evict = self._collect
+
+    def _collect(self, msg: Any) -> None:
+        self._pending.append(msg)
+        self._pending_tokens += self._history._count(msg)
+
+    def maybe_compact(self) -> None:
+        """Starts a background summarization if enough evicted text has piled up and none is running."""
+        if self._task is not None or self._pending_tokens < self.threshold_tokens:
+            return
+
+        self._summarizing = (self._pending, self._pending_tokens)
+        self._pending, self._pending_tokens = [], 0
+        self._task = asyncio.create_task(self._summarize(self._summarizing[0]))
+
+    async def _summarize(self, messages: list) -> str:
+        transcript = "\n".join(
+            msg if isinstance(msg, str) else f"{msg.get('role')}: {msg.get('content')}" for msg in messages
+        )
+        request = [
+            struct_the_prompt("system", SUMMARY_SYSTEM_PROMPT % self.max_summary_words),
+            struct_the_prompt("user", f"<summary>{self.summary}</summary>\n<messages>\n{transcript}\n</messages>"),
+        ]
+        return await agenerate_response(self.client, request, self.model, self.cache)
+
+    def install(self) -> None:
+        """Writes the summary into the pinned prefix if a background summarization has finished."""
+        if self._task is None or not self._task.done():
+            return
+
+        task, self._task = self._task, None
+        if task.cancelled() or task.exception() is not None:
+            # Keep the messages, ahead of the ones evicted since, for the next attempt
+            messages, tokens = self._summarizing
+            self._pending = messages + self._pending
+            self._pending_tokens += tokens
+            reason = "cancelled" if task.cancelled() else repr(task.exception())
+            print(Fore.RED + f"\nHistory summarization failed ({reason}); {len(messages)} messages kept for the next one")
+            return
+
+        self.summary = task.result()
+        msg = struct_the_prompt("user", self.summary, "summary")
+        if self._slot is None:
+            self._slot = self._history.pin(msg)
+        else:
+            self._history.replace_pinned(self._slot, msg)
+
+    def close(self) -> None:
+        """Cancels a summarization that is still running."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,28 +1,193 @@
-from typing import List,Optional,Any
+import time
+from collections import deque
+from collections.abc import Sequence
+from itertools import chain
+from typing import AsyncIterator,Callable,Iterator,List,Optional,Any
 
-def generate_response(client, messages: list, model: str) -> str:
+from src.utils.async_runner import run_sync
+from src.utils.cache import ResponseCache, make_cache_key
+from src.utils.cassette import get_active_cassette
+from src.utils.telemetry import tracer, use_span
+from src.utils.tokens import estimate_message_tokens, estimate_tokens
+from src.utils.backends import Completion, GroqBackend, LLMBackend
+from src.utils.llm_client import LLMError
+
+
+def _as_backend(client) -> LLMBackend:
+    """Wraps a raw provider client (e.g. AsyncGroq) so it can be used like a backend."""
+    return client if isinstance(client, LLMBackend) else GroqBackend(client=client)
+
+
+async def _complete(client, messages: list, model: str, params: dict) -> Completion:
+    """Asks the backend, or the active cassette, for a completion, recording it when the cassette records."""
+    cassette = get_active_cassette()
+    if cassette is not None and cassette.replaying:
+        return cassette.replay_llm(model, messages, params)
+
+    start = time.perf_counter()
+    try:
+        completion = await _as_backend(client).complete(messages, model, **params)
+    except Exception as e:
+        error = e if isinstance(e, LLMError) else LLMError(f"LLM request failed: {e}")
+        if cassette is not None:
+            cassette.record_llm(model, messages, params, error=str(error), seconds=time.perf_counter() - start)
+        if error is e:
+            raise
+        raise error from e
+    if cassette is not None:
+        cassette.record_llm(model, messages, params, completion, seconds=time.perf_counter() - start)
+    return completion
+
+
+def _cached_lookup(cache: Optional[ResponseCache], model: str, messages: list, params: dict) -> tuple:
     """
-    Generates a response from the LLM using the specified model.
+    Looks a request up in the response cache, returning its key (None without a cache) and the cached text.
+
+    A replaying cassette answers before the cache, which is left aside. A recording one also
+    records cache hits, so that replaying the recording with a cold cache finds them.
+    """
+    cassette = get_active_cassette()
+    if cache is None or (cassette is not None and cassette.replaying):
+        return None, None
+
+    key = make_cache_key(model, messages, **params)
+    cached = cache.get(key)
+    if cached is not None and cassette is not None:
+        completion = Completion(cached, estimate_message_tokens(messages), estimate_tokens(cached))
+        cassette.record_llm(model, messages, params, completion)
+    return key, cached
+
+
+async def _replayed_stream(completion: Completion) -> AsyncIterator[str]:
+    if completion.content:
+        yield completion.content
+
+
+async def agenerate_response(client, messages: list, model: str, cache: Optional[ResponseCache] = None, **params) -> str:
+    """
+    Generates a response from the LLM using the specified model without blocking the event loop.
 
     Args:
-        client: The LLM client (e.g., OpenAI API client).
+        client: An LLMClient or LLMBackend. Raw AsyncGroq / Groq clients are accepted as well.
         messages (list): A list of message dictionaries, each with 'role' and 'content'.
         model (str): The model name to use for generating the response.
+        cache (Optional[ResponseCache]): Cache consulted before calling the LLM. Defaults to None.
+        **params: Extra sampling parameters passed to the LLM (e.g. temperature).
 
     Returns:
         str: The content of the response message.
+
+    Raises:
+        LLMError: If the request fails.
     """
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages
-        )
+    with tracer.span("llm.complete", model=model, cache_hit=False, retries=0) as span:
+        key, cached = _cached_lookup(cache, model, messages, params)
+        if cached is not None:
+            span.set("cache_hit", True)
+            return cached
+
+        completion = await _complete(client, messages, model, params)
         # Extract and return the response content
-        return response.choices[0].message.content
+        content = completion.content
+        span.set("prompt_tokens", completion.prompt_tokens)
+        span.set("completion_tokens", completion.completion_tokens)
 
-    except Exception as e:
-        print(f"Error generating response: {e}")
-        return "Error in generating response"
+        if key is not None and content is not None:
+            cache.set(key, content)
+        return content
+
+
+def generate_response(client, messages: list, model: str, cache: Optional[ResponseCache] = None, **params) -> str:
+    """
+    Generates a response from the LLM using the specified model.
+
+    Args:
+        client: An LLMClient or LLMBackend.
+        messages (list): A list of message dictionaries, each with 'role' and 'content'.
+        model (str): The model name to use for generating the response.
+        cache (Optional[ResponseCache]): Cache consulted before calling the LLM. Defaults to None.
+        **params: Extra sampling parameters passed to the LLM (e.g. temperature).
+
+    Returns:
+        str: The content of the response message.
+
+    Raises:
+        LLMError: If the request fails.
+    """
+    return run_sync(agenerate_response(client, messages, model, cache, **params))
+
+
+async def astream_response(client, messages: list, model: str, cache: Optional[ResponseCache] = None, **params) -> AsyncIterator[str]:
+    """
+    Streams a response from the LLM, yielding pieces of text as they arrive.
+
+    Closing the generator early (e.g. breaking out of the ``async for``) closes the underlying
+    HTTP stream, so the provider stops generating tokens nobody will read. A cache hit is
+    yielded as a single piece; only streams read to the end are stored in the cache.
+
+    Args:
+        client: An LLMClient or LLMBackend, or a raw AsyncGroq client.
+        messages (list): A list of message dictionaries, each with 'role' and 'content'.
+        model (str): The model name to use for generating the response.
+        cache (Optional[ResponseCache]): Cache consulted before calling the LLM. Defaults to None.
+        **params: Extra sampling parameters passed to the LLM (e.g. temperature).
+
+    Yields:
+        str: The next piece of the response content.
+
+    Raises:
+        LLMError: If the request fails.
+    """
+    # Not activated: the span stays open across yields, while the caller runs its own code
+    with tracer.span("llm.stream", activate=False, model=model, cache_hit=False, retries=0) as span:
+        key, cached = _cached_lookup(cache, model, messages, params)
+        if cached is not None:
+            span.set("cache_hit", True)
+            yield cached
+            return
+
+        cassette = get_active_cassette()
+        if cassette is not None and cassette.replaying:
+            stream, cassette = _replayed_stream(cassette.replay_llm(model, messages, params)), None
+        else:
+            stream = _as_backend(client).stream(messages, model, **params)
+
+        pieces = []
+        error = None
+        start = time.perf_counter()
+        try:
+            # Retries happen before the first piece, so they are recorded on this span
+            with use_span(span):
+                piece = await anext(stream, None)
+            while piece is not None:
+                pieces.append(piece)
+                yield piece
+                piece = await anext(stream, None)
+        except LLMError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = LLMError(f"LLM request failed: {e}")
+            raise error from e
+        finally:
+            await stream.aclose()
+            if cassette is not None:
+                # Streams closed early are recorded as far as they were read, which is what a replay reads too
+                content = "".join(pieces)
+                completion = Completion(content, estimate_message_tokens(messages), estimate_tokens(content))
+                cassette.record_llm(
+                    model, messages, params,
+                    completion if error is None else None,
+                    error=None if error is None else str(error),
+                    seconds=time.perf_counter() - start,
+                )
+            if tracer.enabled:
+                # Streams carry no usage report, so the counts are estimates
+                span.set("prompt_tokens", estimate_message_tokens(messages))
+                span.set("completion_tokens", estimate_tokens("".join(pieces)))
+
+        if key is not None:
+            cache.set(key, "".join(pieces))
 
 
 def struct_the_prompt(role: str, message: str, tag: str = "") -> dict:
@@ -52,11 +217,11 @@ def struct_the_prompt(role: str, message: str, tag: str = "") -> dict:
         print(f"Error in structuring the prompt: {e}")
         return {"role": "error", "content": "Invalid input"}
 
-def update_chat_history(history: list, msg: dict):
+def update_chat_history(history: "ChatHistory | list", msg: dict):
     """Updates chat history with a new message.
 
     Args:
-        history (list): List containing chat history.
+        history (ChatHistory | list): Container holding the chat history.
         msg (dict): Message to be added.
 
     Raises:
@@ -64,8 +229,8 @@ def update_chat_history(history: list, msg: dict):
     """
     try:
         # Check for correct types
-        if not isinstance(history, list) or not isinstance(msg, dict):
-            raise ValueError("Expected 'history' to be a list and 'msg' to be a dictionary.")
+        if not isinstance(history, (ChatHistory, list)) or not isinstance(msg, dict):
+            raise ValueError("Expected 'history' to be a ChatHistory or list and 'msg' to be a dictionary.")
 
         history.append(msg)  # Append the message
         return history  # Return updated history
@@ -73,21 +238,141 @@ def update_chat_history(history: list, msg: dict):
     except Exception as e:
         print(f"Error in updating history: {e}")
 
-class ChatHistory(list):
+class ChatHistory(Sequence):
     """
-    A custom list to store chat messages with an optional maximum length.
+    A sequence of chat messages with an optional maximum length and token budget.
+
+    The first `pinned` messages (e.g. system prompts) are kept in a fixed prefix that is never
+    evicted; the remaining messages live in a deque, so appending and evicting the oldest
+    message are both O(1). The history itself is a read-only sequence view over both regions
+    and is passed to the LLM client as-is, without building a new list each turn.
+
+    With `max_tokens`, an approximate token count is kept per message and updated as messages
+    come and go, and the oldest unpinned messages are evicted until the history fits the budget.
+    Unpinned messages larger than `max_message_tokens` are truncated when appended. The newest
+    message is always kept, even if the pinned prefix alone exceeds the budget.
 
     Args:
         message (Optional[List[Any]]): Initial list of messages. Defaults to an empty list.
         max_length (int): Maximum number of messages to store. Defaults to -1 (no limit).
+        pinned (int): Number of leading messages that are never evicted. Defaults to 0.
+        max_tokens (Optional[int]): Approximate token budget for the whole history. Defaults to None (no limit).
+        max_message_tokens (Optional[int]): Approximate size above which an unpinned message is truncated.
+            Defaults to None, which caps messages at whatever the budget leaves after the pinned prefix.
+        token_counter (Callable[[str], int]): Function used to count tokens. Defaults to `estimate_tokens`.
+
+    Attributes:
+        on_evict (Optional[Callable[[Any], None]]): Called with every message evicted from the history.
     """
-    def __init__(self, message: Optional[List[Any]] = None, max_length: int = -1):
+    def __init__(
+        self,
+        message: Optional[List[Any]] = None,
+        max_length: int = -1,
+        pinned: int = 0,
+        max_tokens: Optional[int] = None,
+        max_message_tokens: Optional[int] = None,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
         self.max_length = max_length if max_length > 0 else -1
-        super().__init__(message if message is not None else [])
+        self.pinned = pinned
+        self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self.token_counter = token_counter
+        self.total_tokens = 0
+        self._prefix_tokens = 0
+        self.on_evict: Optional[Callable[[Any], None]] = None
+
+        self._prefix: List[Any] = []
+        self._recent: deque = deque()
+        self._recent_tokens: deque = deque()  # Token count of each message in _recent
+        for msg in message if message is not None else []:
+            self.append(msg)
+
+    def __len__(self) -> int:
+        return len(self._prefix) + len(self._recent)
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain(self._prefix, self._recent)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        n_prefix = len(self._prefix)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ChatHistory index out of range")
+        return self._prefix[index] if index < n_prefix else self._recent[index - n_prefix]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ChatHistory, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def _count(self, obj: Any) -> int:
+        return self.token_counter(obj if isinstance(obj, str) else str(obj.get("content", "")))
+
+    def _truncate(self, obj: Any, n_tokens: int) -> tuple:
+        limit = self.max_message_tokens
+        if limit is None and self.max_tokens is not None and self.max_tokens > self._prefix_tokens:
+            # When the pinned prefix alone fills the budget, the message is kept whole rather than
+            # cut down to the truncation marker: the model must still see the current turn
+            limit = self.max_tokens - self._prefix_tokens
+        if limit is None or n_tokens <= limit:
+            return obj, n_tokens
+
+        text = obj if isinstance(obj, str) else str(obj.get("content", ""))
+        # Scale by the measured density so custom token counters are respected
+        keep = max(int(len(text) * limit / n_tokens) - 40, 0)
+        head, tail = text[: keep * 4 // 5], text[len(text) - keep // 5 :] if keep // 5 else ""
+        text = f"{head}\n...[truncated {len(text) - len(head) - len(tail)} characters]...\n{tail}"
+
+        obj = text if isinstance(obj, str) else {**obj, "content": text}
+        return obj, self._count(obj)
+
+    def _evict_oldest(self) -> None:
+        self.total_tokens -= self._recent_tokens.popleft()
+        evicted = self._recent.popleft()
+        if self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def pin(self, obj: Any) -> int:
+        """
+        Adds a message to the end of the pinned prefix, growing it by one slot.
+
+        Args:
+            obj (Any): The message to pin.
+
+        Returns:
+            int: The index of the new pinned slot, usable with `replace_pinned`.
+        """
+        n_tokens = self._count(obj)
+        self._prefix.append(obj)
+        self.pinned = max(self.pinned, len(self._prefix))
+        self._prefix_tokens += n_tokens
+        self.total_tokens += n_tokens
+        return len(self._prefix) - 1
+
+    def replace_pinned(self, index: int, obj: Any) -> None:
+        """
+        Replaces a message of the pinned prefix, e.g. a running summary.
+
+        Args:
+            index (int): The index of the pinned message.
+            obj (Any): The new message.
+        """
+        delta = self._count(obj) - self._count(self._prefix[index])
+        self._prefix[index] = obj
+        self._prefix_tokens += delta
+        self.total_tokens += delta
         
     def append(self, obj: Any):
         """
-        Appends a new message to the chat history while respecting max length.
+        Appends a new message to the chat history while respecting max length and token budget.
 
         Args:
             obj (Any): The message to append.
@@ -98,30 +383,33 @@ class ChatHistory(list):
         if not isinstance(obj, (str, dict)):
             raise TypeError("Only strings or dictionaries are allowed.")
 
-        #print("Current Chat History:", self)
+        n_tokens = self._count(obj)
+        if len(self._prefix) < self.pinned:
+            self._prefix.append(obj)
+            self._prefix_tokens += n_tokens
+            self.total_tokens += n_tokens
+            return
 
-        # Enforce max length if applicable
-        if self.max_length > 0 and len(self) >= self.max_length:
-            self.pop(0)
+        obj, n_tokens = self._truncate(obj, n_tokens)
 
-        super().append(obj) # equivalent to list.append(self,object)
+        if self.max_length > 0 and len(self._recent) >= max(self.max_length - self.pinned, 1):
+            self._evict_oldest()
 
+        self._recent.append(obj)
+        self._recent_tokens.append(n_tokens)
+        self.total_tokens += n_tokens
 
-class FixedFirstChatHistory(ChatHistory):
-    """Preserves the first message and removes the second when max_length is reached."""
+        if self.max_tokens is not None:
+            # Never evict the message just appended
+            while self.total_tokens > self.max_tokens and len(self._recent) > 1:
+                self._evict_oldest()
 
-    def __init__(self, message: Optional[List[Any]] = None, max_length: int = -1):
-        # Properly call parent constructor
-        super().__init__(message, max_length)
 
-    def append(self, obj: Any):
-        """Appends a new message, preserving the first and removing the second if needed."""
-        # Check if max length constraint applies and the list is long enough
-        if self.max_length != -1 and len(self) >= self.max_length:
-            if len(self) > 1:  # Ensure at least 2 elements
-                self.pop(1)  # Remove the second message instead of the first
+class FixedFirstChatHistory(ChatHistory):
+    """Preserves the first message and evicts the oldest of the others when max_length or max_tokens is reached."""
 
-        super().append(obj)
+    def __init__(self, message: Optional[List[Any]] = None, max_length: int = -1, max_tokens: Optional[int] = None):
+        super().__init__(message, max_length, pinned=1, max_tokens=max_tokens)
         
 if __name__ == "__main__":
     chat = FixedFirstChatHistory(max_length=3)  # Limit to 3 messages
@@ -1,5 +1,6 @@
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 
 
 @dataclass
@@ -16,6 +17,11 @@ class TagContentResult:
     found: bool
 
 
+@lru_cache(maxsize=128)
+def _tag_pattern(tag: str) -> re.Pattern:
+    return re.compile(rf"<{re.escape(tag)}>(.*?)</{re.escape(tag)}>", re.DOTALL)
+
+
 def extract_tag_content(text: str, tag: str) -> TagContentResult:
     """
     Extracts all content enclosed by specified tags (e.g., <thought>, <response>, etc.).
@@ -25,18 +31,137 @@ def extract_tag_content(text: str, tag: str) -> TagContentResult:
         tag (str): The name of the tag to search for (e.g., 'thought', 'response').
 
     Returns:
-        dict: A dictionary with the following keys:
-            - 'content' (list): A list of strings containing the content found between the specified tags.
-            - 'found' (bool): A flag indicating whether any content was found for the given tag.
+        TagContentResult: The content found between the specified tags and whether any was found.
     """
-    # Build the regex pattern dynamically to find multiple occurrences of the tag
-    tag_pattern = rf"<{tag}>(.*?)</{tag}>"
-
-    # Use findall to capture all content between the specified tag
-    matched_contents = re.findall(tag_pattern, text, re.DOTALL)
+    # The pattern for each tag is compiled once and reused
+    matched_contents = _tag_pattern(tag).findall(text)
 
     # Return the dataclass instance with the result
     return TagContentResult(
         content=[content.strip() for content in matched_contents],
         found=bool(matched_contents),
-    )
\ No newline at end of file
+    )
+
+
+class TagExtractor:
+    """
+    Extracts several tags at once with patterns compiled a single time.
+
+    `extract` scans the text once for all the tags instead of once per tag. Tags of the
+    same extractor are not expected to nest: content of a matched tag is not searched again.
+
+    Args:
+        tags (list[str]): The tag names to look for (e.g. ['response', 'thought', 'tool_call']).
+    """
+
+    def __init__(self, tags: list[str]):
+        self.tags = tuple(tags)
+        names = "|".join(re.escape(tag) for tag in self.tags)
+        self._pattern = re.compile(rf"<({names})>(.*?)</\1>", re.DOTALL)
+        self._open_pattern = re.compile(rf"<({names})>")
+
+    def extract(self, text: str) -> dict[str, TagContentResult]:
+        """
+        Extracts the content of every tag in a single pass over the text.
+
+        Args:
+            text (str): The input string containing multiple potential tags.
+
+        Returns:
+            dict[str, TagContentResult]: The result for each tag of the extractor, found or not.
+        """
+        contents = {tag: [] for tag in self.tags}
+        for match in self._pattern.finditer(text):
+            contents[match.group(1)].append(match.group(2).strip())
+
+        return {tag: TagContentResult(content=found, found=bool(found)) for tag, found in contents.items()}
+
+    def stream(self) -> "TagStreamParser":
+        """
+        Creates an incremental parser for text that arrives in pieces, sharing the compiled patterns.
+
+        Returns:
+            TagStreamParser: A parser with a `feed` method.
+        """
+        return TagStreamParser(self)
+
+
+class TagStreamParser:
+    """
+    Incrementally extracts tag content from text that arrives in pieces, e.g. a streamed completion.
+
+    Each call to `feed` only scans the newly received text plus a few characters carried over
+    from the previous piece, so parsing a whole stream costs time linear in its length.
+
+    Args:
+        tags (list[str] | TagExtractor): The tag names to look for, or an extractor to share patterns with.
+    """
+
+    def __init__(self, tags: "list[str] | TagExtractor"):
+        extractor = tags if isinstance(tags, TagExtractor) else TagExtractor(tags)
+        self.tags = extractor.tags
+        self._open_pattern = extractor._open_pattern
+        self._longest_open = max(len(tag) for tag in self.tags) + 2
+        self._carry = ""  # Unscanned tail that may hold the start of a tag
+        self._open_tag = None  # Tag whose closing tag we are waiting for
+        self._pieces = []  # Content received so far for the open tag
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """
+        Adds a piece of text and returns the tags it completed.
+
+        Args:
+            chunk (str): The newly received text.
+
+        Returns:
+            list[tuple[str, str]]: (tag, stripped content) pairs, in the order their closing tags appeared.
+        """
+        data = self._carry + chunk
+        completed = []
+
+        while True:
+            if self._open_tag is None:
+                match = self._open_pattern.search(data)
+                if match is None:
+                    # Keep enough of the tail to catch an opening tag split across pieces
+                    self._carry = data[-(self._longest_open - 1):]
+                    break
+                self._open_tag = match.group(1)
+                self._pieces = []
+                data = data[match.end():]
+
+            closing = f"</{self._open_tag}>"
+            end = data.find(closing)
+            if end == -1:
+                keep = min(len(closing) - 1, len(data))
+                self._pieces.append(data[:len(data) - keep])
+                self._carry = data[len(data) - keep:]
+                break
+
+            self._pieces.append(data[:end])
+            completed.append((self._open_tag, "".join(self._pieces).strip()))
+            self._open_tag = None
+            data = data[end + len(closing):]
+
+        return completed
+
+    @property
+    def open_tag(self) -> "str | None":
+        """The tag whose content is being received, or None between tags."""
+        return self._open_tag
+
+    def partial(self, settled: bool = False) -> str:
+        """
+        Returns the content received so far for the open tag (empty between tags).
+
+        Args:
+            settled (bool, optional): Leave out the last few characters, which may be the start of
+                the closing tag, so the result is always a prefix of the final content. Defaults to False.
+
+        Returns:
+            str: The unstripped content so far.
+        """
+        if self._open_tag is None:
+            return ""
+        content = "".join(self._pieces)
+        return content if settled else content + self._carry
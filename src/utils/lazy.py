@@ -0,0 +1,67 @@
+import importlib
+import threading
+from typing import Any, Optional
+
+
+class LazyImport:
+    """
+    Stands in for a module, or one of its attributes, until it is first used.
+
+    Importing the agent modules then costs nothing for dependencies a process never touches,
+    e.g. the provider SDK in a worker driven by a ScriptedBackend, or Graphviz in a worker that
+    never plots.
+
+    Args:
+        module (str): The module to import, e.g. "groq".
+        attribute (Optional[str]): An attribute of the module to stand in for, e.g. "Fore". Defaults to None.
+
+    Example:
+        >>> groq = LazyImport("groq")
+        >>> Fore = LazyImport("colorama", "Fore")
+    """
+
+    __slots__ = ("_module", "_attribute", "_target")
+
+    def __init__(self, module: str, attribute: Optional[str] = None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _resolve(self) -> Any:
+        target = self._target
+        if target is None:
+            target = importlib.import_module(self._module)
+            if self._attribute is not None:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __repr__(self) -> str:
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<LazyImport {name} ({state})>"
+
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env() -> None:
+    """
+    Loads the variables of the nearest `.env` file into os.environ, once per process.
+
+    Called before the first provider client is built instead of when the agent modules are imported.
+    """
+    global _env_loaded
+
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
@@ -0,0 +1,370 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Sequence
+
+from src.utils.backends import Completion, GroqBackend, LLMBackend, TransientBackendError
+from src.utils.telemetry import get_current_span
+from src.utils.tokens import estimate_message_tokens
+
+
+class LLMError(Exception):
+    """Raised when a completion request fails and will not be retried any further."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute.
+
+    Callers reserve capacity up front and then sleep for as long as the buckets are in debt,
+    so concurrent callers queue up fairly without holding a lock while they wait.
+
+    Args:
+        requests_per_minute (Optional[int]): Request budget per minute. Defaults to None (unlimited).
+        tokens_per_minute (Optional[int]): Token budget per minute. Defaults to None (unlimited).
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Takes one request and `tokens` tokens from the buckets.
+
+        Args:
+            tokens (int): Estimated tokens of the request.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0
+            if self.requests_per_minute:
+                self._requests -= 1
+                wait = max(wait, -self._requests * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+                wait = max(wait, -self._tokens * 60 / self.tokens_per_minute)
+            return wait
+
+    def adjust(self, tokens: int) -> None:
+        """
+        Corrects the token bucket once the real usage of a request is known.
+
+        Args:
+            tokens (int): Actual tokens minus the estimate that was reserved.
+        """
+        if self.tokens_per_minute:
+            with self._lock:
+                self._tokens -= tokens
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Waits until a request of `tokens` tokens fits in the budget.
+
+        Args:
+            tokens (int): Estimated tokens of the request.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Attributes:
+        max_retries (int): Retries after the first attempt. Defaults to 5.
+        base_delay (float): Delay ceiling of the first retry, in seconds. Defaults to 0.5.
+        max_delay (float): Maximum delay ceiling, in seconds. Defaults to 30.
+    """
+
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Computes how long to wait before the next attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+            retry_after (Optional[float]): Delay requested by the provider, which is always honored.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for a while.
+
+    After `failure_threshold` consecutive retryable failures the circuit opens and calls fail
+    immediately. Once `reset_timeout` has passed one trial call is let through: success closes
+    the circuit again, failure re-opens it.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit. Defaults to 5.
+        reset_timeout (float): Seconds before a trial call is allowed. Defaults to 30.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Checks whether a call may go through.
+
+        Returns:
+            bool: True if the call is the trial call of an open circuit. Its caller must record
+                its outcome, or call `release_trial` if it ends without one.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            if self._trial_running or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("Circuit breaker is open: the LLM provider is failing, not sending the request.")
+            self._trial_running = True
+            return True
+
+    def release_trial(self) -> None:
+        """Lets another trial call through after one ended without an outcome, e.g. it was cancelled."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """
+    Completion client with rate limiting, retries and circuit breaking around an LLM backend.
+
+    It exposes the same `complete` / `stream` methods as the backends, so agents accept
+    either one. Share an instance between agents to share its limits and connection pool.
+
+    Args:
+        backend (Optional[LLMBackend]): The provider backend. Defaults to GroqBackend().
+        rate_limiter (Optional[RateLimiter]): Request / token budget. Defaults to None (unlimited).
+        retry_policy (Optional[RetryPolicy]): Backoff settings. Defaults to RetryPolicy().
+        circuit_breaker (Optional[CircuitBreaker]): Circuit breaker. Defaults to CircuitBreaker().
+    """
+
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.backend = backend if backend is not None else GroqBackend()
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+    async def _before_attempt(self, estimated: int) -> bool:
+        trial = self.circuit_breaker.before_call()
+        if self.rate_limiter is not None:
+            try:
+                await self.rate_limiter.acquire(estimated)
+            except BaseException:
+                if trial:
+                    self.circuit_breaker.release_trial()
+                raise
+        return trial
+
+    async def _after_failure(self, error: Exception, attempt: int) -> None:
+        """Waits before the next attempt, or raises LLMError if the failure is final."""
+        if not isinstance(error, TransientBackendError):
+            # The provider answered, so this does not count against its health
+            self.circuit_breaker.record_success()
+            raise LLMError(f"LLM request failed: {error}") from error
+
+        self.circuit_breaker.record_failure()
+        if attempt >= self.retry_policy.max_retries:
+            raise LLMError(f"LLM request failed after {attempt + 1} attempts: {error}") from error
+
+        get_current_span().set("retries", attempt + 1)
+        await asyncio.sleep(self.retry_policy.delay(attempt, error.retry_after))
+
+    async def complete(self, messages: Sequence, model: str, **params) -> Completion:
+        """
+        Requests a completion, retrying transient failures.
+
+        Args:
+            messages (Sequence): The message dictionaries to send.
+            model (str): The model name.
+            **params: Extra sampling parameters (e.g. temperature).
+
+        Returns:
+            Completion: The generated text and its token usage.
+
+        Raises:
+            LLMError: If the request fails with a permanent error or runs out of retries.
+            CircuitOpenError: If the circuit breaker is open.
+        """
+        estimated = estimate_message_tokens(messages) + (params.get("max_tokens") or 0)
+        attempt = 0
+
+        while True:
+            trial = await self._before_attempt(estimated)
+            try:
+                completion = await self.backend.complete(messages, model, **params)
+            except Exception as e:
+                await self._after_failure(e, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled: no outcome to record, but the trial slot must not stay taken
+                if trial:
+                    self.circuit_breaker.release_trial()
+                raise
+
+            self.circuit_breaker.record_success()
+            if self.rate_limiter is not None and completion.total_tokens:
+                self.rate_limiter.adjust(completion.total_tokens - estimated)
+            return completion
+
+    async def stream(self, messages: Sequence, model: str, **params) -> AsyncIterator[str]:
+        """
+        Streams a completion. Failures before the first piece are retried; later ones are raised.
+
+        Args:
+            messages (Sequence): The message dictionaries to send.
+            model (str): The model name.
+            **params: Extra sampling parameters (e.g. temperature).
+
+        Yields:
+            str: The next piece of the completion.
+
+        Raises:
+            LLMError: If the request fails with a permanent error or runs out of retries.
+            CircuitOpenError: If the circuit breaker is open.
+        """
+        estimated = estimate_message_tokens(messages) + (params.get("max_tokens") or 0)
+        attempt = 0
+
+        while True:
+            trial = await self._before_attempt(estimated)
+            pieces = self.backend.stream(messages, model, **params)
+            try:
+                first = await pieces.__anext__()
+            except StopAsyncIteration:
+                self.circuit_breaker.record_success()
+                return
+            except Exception as e:
+                await pieces.aclose()
+                await self._after_failure(e, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.circuit_breaker.release_trial()
+                await pieces.aclose()
+                raise
+
+            self.circuit_breaker.record_success()
+            try:
+                yield first
+                async for piece in pieces:
+                    yield piece
+            except Exception as e:
+                raise LLMError(f"LLM stream failed: {e}") from e
+            finally:
+                await pieces.aclose()
+            return
+
+
+_default_client: Optional[LLMClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> LLMClient:
+    """
+    Returns the process-wide LLMClient shared by agents that are not given one.
+
+    Returns:
+        LLMClient: The shared client.
+    """
+    global _default_client
+
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+    return _default_client
+
+
+def configure_default_client(
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+) -> LLMClient:
+    """
+    Replaces the shared client with one using the given limits, e.g. the provider's quota.
+
+    Agents created afterwards use the new client.
+
+    Args:
+        requests_per_minute (Optional[int]): Request budget per minute. Defaults to None (unlimited).
+        tokens_per_minute (Optional[int]): Token budget per minute. Defaults to None (unlimited).
+        retry_policy (Optional[RetryPolicy]): Backoff settings. Defaults to RetryPolicy().
+        circuit_breaker (Optional[CircuitBreaker]): Circuit breaker. Defaults to CircuitBreaker().
+
+    Returns:
+        LLMClient: The new shared client.
+    """
+    global _default_client
+
+    rate_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    with _default_client_lock:
+        _default_client = LLMClient(
+            rate_limiter=rate_limiter, retry_policy=retry_policy, circuit_breaker=circuit_breaker
+        )
+    return _default_client
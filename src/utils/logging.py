@@ -1,7 +1,8 @@
-import time
+from src.utils.lazy import LazyImport
 
-from colorama import Fore
-from colorama import Style
+# colorama is imported on the first colored print
+Fore = LazyImport("colorama", "Fore")
+Style = LazyImport("colorama", "Style")
 
 
 def fancy_print(message: str) -> None:
@@ -14,7 +15,6 @@ def fancy_print(message: str) -> None:
     print(Style.BRIGHT + Fore.CYAN + f"\n{'=' * 50}")
     print(Fore.MAGENTA + f"{message}")
     print(Style.BRIGHT + Fore.CYAN + f"{'=' * 50}\n")
-    time.sleep(0.5)
 
 
 def fancy_step_tracker(step: int, total_steps: int) -> None:
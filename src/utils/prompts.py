@@ -0,0 +1,47 @@
+from typing import Iterable
+
+
+def join_tool_signatures(tools: Iterable) -> str:
+    """
+    Joins the JSON signatures of tools in a stable order (by name).
+
+    Agents given the same tools in a different order then send the same prompt prefix.
+
+    Args:
+        tools (Iterable[Tool]): The tools.
+
+    Returns:
+        str: The concatenated signatures.
+    """
+    return "".join(tool.fn_signature for tool in sorted(tools, key=lambda tool: tool.name))
+
+
+class PromptLayout:
+    """
+    A prompt split into a stable prefix, assembled once, and volatile content rendered after it.
+
+    LLM providers cache the longest prompt prefix they have already seen. Keeping every part
+    that does not change between calls byte-identical at the start of the prompt, and appending
+    per-call content last, lets them reuse it and cuts time to first token and input cost.
+
+    Args:
+        *stable_parts (str): Parts that are the same on every call, in order. Empty parts are skipped.
+        separator (str, optional): Text placed between parts. Defaults to a blank line.
+    """
+
+    def __init__(self, *stable_parts: str, separator: str = "\n\n"):
+        self.separator = separator
+        self.prefix = separator.join(part.strip() for part in stable_parts if part)
+
+    def render(self, *volatile_parts: str) -> str:
+        """
+        Appends the per-call parts to the stable prefix.
+
+        Args:
+            *volatile_parts (str): Parts that change between calls. Empty parts are skipped.
+
+        Returns:
+            str: The full prompt, starting with the unchanged prefix.
+        """
+        volatile = self.separator.join(part for part in volatile_parts if part)
+        return f"{self.prefix}{self.separator}{volatile}" if volatile else self.prefix
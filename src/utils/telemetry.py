@@ -0,0 +1,276 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+# Spans started inside another span (in the same task, or in tasks it creates) become its children
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_current_agent: ContextVar[Optional[str]] = ContextVar("current_agent", default=None)
+
+
+class Span:
+    """
+    One timed operation (an LLM call, a tool call, an agent run) and its attributes.
+
+    Attributes:
+        name (str): Operation name, e.g. 'llm.complete' or 'tool.call'.
+        trace_id (str): ID shared by every span of the same trace (32 hex digits).
+        span_id (str): ID of this span (16 hex digits).
+        parent_id (Optional[str]): ID of the enclosing span, if any.
+        start_ns (int): Start time, in nanoseconds since the epoch.
+        end_ns (int): End time, in nanoseconds since the epoch.
+        attributes (dict): Measurements and labels (model, tokens, cache_hit, retries, agent...).
+        status (str): 'ok' or 'error'.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "_start_perf")
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = self.start_ns
+        self._start_perf = time.perf_counter_ns()
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, key: str, value: Any) -> None:
+        """Sets an attribute of the span."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        """
+        Converts the span to a JSON-friendly dict laid out like an OpenTelemetry span.
+
+        Returns:
+            dict: The span fields.
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_s": self.duration,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled, so instrumented code costs one attribute check."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict, activate: bool):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._activate = activate
+        self._token = None
+        self._span = None
+
+    def __enter__(self) -> Span:
+        agent = _current_agent.get()
+        if agent is not None:
+            self._attributes.setdefault("agent", agent)
+        self._span = Span(self._name, self._attributes, _current_span.get())
+        if self._activate:
+            self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self._span
+        span.end_ns = span.start_ns + time.perf_counter_ns() - span._start_perf
+        # Closing a stream early is not a failure
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            span.status = "error"
+            span.attributes["error.type"] = exc_type.__name__
+        if self._token is not None:
+            _current_span.reset(self._token)
+        self._tracer.export(span)
+        return False
+
+
+class Tracer:
+    """
+    Records spans and hands every finished span to the registered exporters.
+
+    With no exporter registered, `span` returns a shared no-op object and nothing is recorded.
+    """
+
+    def __init__(self):
+        self.exporters: list[Callable[[Span], None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter: Callable[[Span], None]) -> Callable[[Span], None]:
+        """
+        Registers a callable that receives every finished span.
+
+        Args:
+            exporter (Callable[[Span], None]): E.g. a JsonLinesExporter or an InMemoryCollector.
+
+        Returns:
+            Callable[[Span], None]: The exporter, for later removal.
+        """
+        self.exporters.append(exporter)
+        return exporter
+
+    def remove_exporter(self, exporter: Callable[[Span], None]) -> None:
+        """Unregisters an exporter."""
+        self.exporters.remove(exporter)
+
+    def span(self, name: str, activate: bool = True, **attributes):
+        """
+        Starts a span, used as a context manager.
+
+        Args:
+            name (str): Operation name.
+            activate (bool, optional): Make it the parent of spans started inside it. Disable for
+                spans held open across the yields of a generator. Defaults to True.
+            **attributes: Initial attributes.
+
+        Returns:
+            A context manager yielding the Span (or a no-op stand-in when tracing is disabled).
+        """
+        if not self.exporters:
+            return _NOOP_SPAN
+        return _ActiveSpan(self, name, attributes, activate)
+
+    def export(self, span: Span) -> None:
+        """Hands a finished span to the exporters. Exporter failures never reach the agents."""
+        for exporter in self.exporters:
+            try:
+                exporter(span)
+            except Exception as e:
+                print(f"Error exporting span: {e}")
+
+
+tracer = Tracer()
+
+
+def get_current_span():
+    """Returns the innermost active span, or a no-op stand-in."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+class use_span:
+    """
+    Makes a span the parent of the spans started inside this block.
+
+    Useful for spans started with ``activate=False``, e.g. around the first step of a stream.
+
+    Args:
+        span: The span to activate (a no-op stand-in is accepted and ignored).
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        if isinstance(self.span, Span):
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current_span.reset(self._token)
+        return False
+
+
+class agent_scope:
+    """
+    Labels the spans started inside it with an agent name.
+
+    Args:
+        name (str): The agent name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_agent.set(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_agent.reset(self._token)
+        return False
+
+
+class JsonLinesExporter:
+    """
+    Appends every span as one JSON object per line to a file.
+
+    Args:
+        path (str): The file to append to.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class InMemoryCollector:
+    """
+    Keeps finished spans in memory, e.g. for tests or to forward them to an OpenTelemetry SDK.
+
+    Args:
+        max_spans (Optional[int]): Oldest spans are dropped beyond this number. Defaults to None (keep all).
+    """
+
+    def __init__(self, max_spans: Optional[int] = None):
+        self.max_spans = max_spans
+        self.spans: deque[Span] = deque(maxlen=max_spans)  # Drops the oldest span in O(1) once full
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dicts(self) -> list[dict]:
+        """Returns the collected spans as OpenTelemetry-style dicts."""
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
@@ -0,0 +1,37 @@
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply approximates the number of tokens in a piece of text (about four characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The approximate token count.
+    """
+    return (len(text) + 3) // 4
+
+
+def message_content(msg) -> str:
+    """
+    Returns the text of a chat message.
+
+    Args:
+        msg: A message dictionary, or a plain string.
+
+    Returns:
+        str: The message's 'content', or the message itself as a string.
+    """
+    return str(msg.get("content", "")) if isinstance(msg, dict) else str(msg)
+
+
+def estimate_message_tokens(messages) -> int:
+    """
+    Approximates the number of tokens in a list of chat messages.
+
+    Args:
+        messages (list): Message dictionaries (or strings).
+
+    Returns:
+        int: The approximate token count of all message contents.
+    """
+    return sum(estimate_tokens(message_content(msg)) for msg in messages)
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.tool_agent.tool import tool
+from src.tool_agent.tool_executor import ToolExecutor
+from src.utils.backends import ScriptedBackend
+from src.utils.cache import MemoryCache
+from src.utils.cassette import Cassette, CassetteMiss, get_active_cassette, llm_request_key
+from src.utils.completions import astream_response, generate_response
+
+
+class Offline:
+    """A backend that must not be called while replaying."""
+
+    async def complete(self, *args, **kwargs):
+        raise AssertionError("the backend was called during a replay")
+
+    async def stream(self, *args, **kwargs):
+        raise AssertionError("the backend was called during a replay")
+        yield
+
+
+@tool
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+def ask(client, question: str, cache=None) -> str:
+    return generate_response(client, [{"role": "user", "content": question}], "model", cache)
+
+
+def stream(client, question: str) -> str:
+    async def collect():
+        return "".join([piece async for piece in astream_response(client, [{"role": "user", "content": question}], "model")])
+    return asyncio.run(collect())
+
+
+def test_record_then_replay_without_backend(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    with Cassette(path, mode="record"):
+        assert ask(ScriptedBackend(["first"]), "one") == "first"
+        assert stream(ScriptedBackend(["second answer"], chunk_tokens=1), "two") == "second answer"
+        assert asyncio.run(ToolExecutor([add]).arun_call('{"name": "add", "arguments": {"a": 1, "b": 2}}')) == (0, 3)
+
+    with Cassette(path) as cassette:
+        assert ask(Offline(), "one") == "first"
+        assert stream(Offline(), "two") == "second answer"
+        assert asyncio.run(ToolExecutor([add]).arun_call('{"name": "add", "arguments": {"a": 1, "b": 2}}')) == (0, 3)
+    assert cassette.divergences == []
+    assert cassette.unused() == {}
+    assert get_active_cassette() is None
+
+
+def test_whitespace_does_not_change_the_request_key():
+    assert llm_request_key("m", [{"role": "user", "content": "a  b\n"}]) == llm_request_key("m", [{"role": "user", "content": "a b"}])
+    assert llm_request_key("m", [{"role": "user", "content": "a"}], stream=True) == llm_request_key("m", [{"role": "user", "content": "a"}])
+    assert llm_request_key("m", ["plain text"]) == llm_request_key("m", ["plain  text"])
+
+
+def test_divergence_falls_back_to_the_next_recording(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    with Cassette(path, mode="record"):
+        ask(ScriptedBackend(["recorded"]), "original question")
+
+    with Cassette(path) as cassette:
+        assert ask(Offline(), "different question") == "recorded"
+    assert len(cassette.divergences) == 1
+    assert cassette.divergences[0].kind == "llm"
+
+
+def test_strict_replay_raises_on_divergence(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    with Cassette(path, mode="record"):
+        ask(ScriptedBackend(["recorded"]), "original question")
+
+    with Cassette(path, strict=True):
+        with pytest.raises(CassetteMiss):
+            ask(Offline(), "different question")
+
+
+def test_cache_hits_are_recorded(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    cache = MemoryCache()
+    ask(ScriptedBackend(["cached"]), "question", cache)
+    with Cassette(path, mode="record"):
+        assert ask(ScriptedBackend(["live"]), "question", cache) == "cached"
+
+    # Replayed with a cold cache
+    with Cassette(path) as cassette:
+        assert ask(Offline(), "question", MemoryCache()) == "cached"
+    assert cassette.divergences == []
+
+
+def test_only_one_cassette_at_a_time(tmp_path):
+    with Cassette(str(tmp_path / "a.jsonl"), mode="record"):
+        with pytest.raises(RuntimeError):
+            with Cassette(str(tmp_path / "b.jsonl"), mode="record"):
+                pass
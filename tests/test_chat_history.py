@@ -0,0 +1,54 @@
+from src.utils.completions import ChatHistory, FixedFirstChatHistory
+
+
+def message(content: str, role: str = "user") -> dict:
+    return {"role": role, "content": content}
+
+
+def test_max_length_evicts_oldest_unpinned_message():
+    history = FixedFirstChatHistory([message("system", "system")], max_length=3)
+    for text in ("one", "two", "three"):
+        history.append(message(text))
+
+    assert [m["content"] for m in history] == ["system", "two", "three"]
+
+
+def test_token_budget_evicts_until_it_fits():
+    evicted = []
+    history = ChatHistory([message("s" * 40, "system")], pinned=1, max_tokens=40)
+    history.on_evict = evicted.append
+    for index in range(5):
+        history.append(message(f"{index}" * 40))
+
+    assert history.total_tokens <= 40
+    assert history[-1]["content"] == "4" * 40
+    # 10 tokens each: the system prompt and the three newest messages fit
+    assert [m["content"][0] for m in history] == ["s", "2", "3", "4"]
+    assert [m["content"][0] for m in evicted] == ["0", "1"]
+    assert history.total_tokens == sum(history._count(m) for m in history)
+
+
+def test_oversized_message_is_truncated_to_the_budget():
+    history = ChatHistory([message("system", "system")], pinned=1, max_tokens=100)
+    history.append(message("x" * 2000))
+
+    assert history.total_tokens <= 100
+    assert "[truncated" in history[-1]["content"]
+
+
+def test_newest_message_kept_when_prefix_fills_the_budget():
+    history = ChatHistory([message("s" * 400, "system")], pinned=1, max_tokens=50)
+    history.append(message("first question"))
+    history.append(message("what is 2 + 2?"))
+
+    assert list(history)[1:] == [message("what is 2 + 2?")]
+
+
+def test_pinned_slots_can_be_replaced():
+    history = ChatHistory([message("system", "system")], pinned=1, max_tokens=1000)
+    history.append(message("question"))
+    slot = history.pin(message("summary v1"))
+    history.replace_pinned(slot, message("summary v2, longer"))
+
+    assert [m["content"] for m in history] == ["system", "summary v2, longer", "question"]
+    assert history.total_tokens == sum(history._count(m) for m in history)
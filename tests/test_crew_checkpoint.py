@@ -0,0 +1,58 @@
+import pytest
+
+from src.multiagent_systen.agent import Agent
+from src.multiagent_systen.crew import Crew
+from src.utils.backends import ScriptedBackend
+from src.utils.cache import MemoryCache, SQLiteCache
+
+
+def scripted(name: str, failing: set) -> ScriptedBackend:
+    def script(messages, model):
+        if name in failing:
+            raise RuntimeError(f"{name} failed")
+        return f"<response>{name} output</response>"
+    return ScriptedBackend(script)
+
+
+def build(store, failing=frozenset(), task_b: str = "task b") -> Crew:
+    crew = Crew(checkpoint=store)
+    with crew:
+        a = Agent("a", "backstory", "task a", backend=scripted("a", failing))
+        b = Agent("b", "backstory", task_b, backend=scripted("b", failing))
+        c = Agent("c", "backstory", "task c", backend=scripted("c", failing))
+        a >> b >> c
+    return crew
+
+
+def test_rerun_after_failure_restores_finished_agents(tmp_path):
+    store = SQLiteCache(str(tmp_path / "checkpoint.db"))
+    with pytest.raises(Exception):
+        build(store, failing={"c"}).run()
+
+    # A new crew, as in a new process, against the same store
+    crew = build(SQLiteCache(store.path))
+    outputs = crew.run()
+    assert crew.restored == {"a", "b"}
+    assert "c output" in outputs["c"]
+
+
+def test_unchanged_crew_is_fully_restored():
+    store = MemoryCache()
+    first = build(store).run()
+    crew = build(store)
+    assert crew.run() == first
+    assert crew.restored == {"a", "b", "c"}
+
+    # Rerunning the same crew object also restores everything
+    crew.run()
+    assert crew.restored == {"a", "b", "c"}
+
+
+def test_edited_agent_reruns_with_its_dependents_only_if_needed():
+    store = MemoryCache()
+    build(store).run()
+
+    crew = build(store, task_b="edited task b")
+    crew.run()
+    # b's prompt changed; its output did not, so c's inputs are unchanged
+    assert crew.restored == {"a", "c"}
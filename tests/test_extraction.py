@@ -0,0 +1,56 @@
+import pytest
+
+from src.utils.extraction import TagExtractor, TagStreamParser
+
+COMPLETION = (
+    "<thought>I should add</thought>\n"
+    '<tool_call>{"name": "add", "arguments": {"a": 1, "b": 2}}</tool_call>\n'
+    "<response>It is 3</response>"
+)
+EXPECTED = [
+    ("thought", "I should add"),
+    ("tool_call", '{"name": "add", "arguments": {"a": 1, "b": 2}}'),
+    ("response", "It is 3"),
+]
+
+
+def feed_in_chunks(text: str, size: int) -> list:
+    parser = TagStreamParser(["response", "thought", "tool_call"])
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13, len(COMPLETION)])
+def test_tags_split_across_chunks(size):
+    assert feed_in_chunks(COMPLETION, size) == EXPECTED
+
+
+def test_stream_matches_batch_extraction():
+    extracted = TagExtractor(["response", "thought", "tool_call"]).extract(COMPLETION)
+
+    assert extracted["thought"].content == ["I should add"]
+    assert extracted["response"].found
+    assert [content for tag, content in feed_in_chunks(COMPLETION, 4) if tag == "response"] == extracted["response"].content
+
+
+def test_open_tag_and_settled_partial():
+    parser = TagStreamParser(["response"])
+    parser.feed("noise <respo")
+    assert parser.open_tag is None
+
+    parser.feed("nse>Hello wor")
+    assert parser.open_tag == "response"
+    assert "Hello wor".startswith(parser.partial(settled=True))
+
+    parser.feed("ld</resp")
+    assert "Hello world".startswith(parser.partial(settled=True))
+    assert parser.feed("onse>") == [("response", "Hello world")]
+    assert parser.open_tag is None
+    assert parser.partial() == ""
+
+
+def test_unknown_tags_are_ignored():
+    parser = TagStreamParser(["response"])
+    assert parser.feed("<other>x</other><response>ok</response>") == [("response", "ok")]
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from src.utils.backends import ScriptedBackend
+from src.utils.llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+def open_breaker() -> CircuitBreaker:
+    # Opened by one failure, with the trial call allowed straight away
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+async def collect(stream) -> str:
+    return "".join([piece async for piece in stream])
+
+
+def test_trial_call_admits_one_caller():
+    breaker = open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.before_call() is False
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cancelled_trial_releases_the_circuit(streaming):
+    breaker = open_breaker()
+
+    async def scenario():
+        slow = LLMClient(ScriptedBackend(["slow"], latency=60), circuit_breaker=breaker)
+        call = slow.stream(MESSAGES, "model") if streaming else slow.complete(MESSAGES, "model")
+        trial = asyncio.ensure_future(collect(call) if streaming else call)
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        fast = LLMClient(ScriptedBackend(["fast"]), circuit_breaker=breaker)
+        if streaming:
+            return await collect(fast.stream(MESSAGES, "model"))
+        return (await fast.complete(MESSAGES, "model")).content
+
+    assert asyncio.run(scenario()) == "fast"
+    assert breaker.opened_at is None
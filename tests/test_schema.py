@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import pytest
+
+from src.tool_agent.schema import compile_validator
+
+
+@dataclass
+class Point:
+    x: int
+    y: float = 0.0
+
+
+def plot(
+    count: int,
+    ratio: float,
+    label: str,
+    enabled: bool,
+    tags: list[str],
+    point: Point,
+    mode: Literal["fast", "slow"] = "fast",
+    limit: Optional[int] = None,
+):
+    """A tool with every supported kind of parameter."""
+
+
+validate = compile_validator(plot)
+VALID = {"count": 3, "ratio": 0.5, "label": "a", "enabled": True, "tags": ["x"], "point": {"x": 1}}
+
+
+def test_valid_arguments_get_defaults():
+    assert validate(VALID) == {**VALID, "point": Point(1), "mode": "fast", "limit": None}
+
+
+@pytest.mark.parametrize("name, value, expected", [
+    ("count", "7", 7),
+    ("count", 7.0, 7),
+    ("ratio", "2.5", 2.5),
+    ("ratio", 2, 2.0),
+    ("label", 12, "12"),
+    ("enabled", "false", False),
+    ("enabled", 1, True),
+    ("tags", '["a", "b"]', ["a", "b"]),
+    ("point", '{"x": "2", "y": 1}', Point(2, 1.0)),
+    ("limit", "5", 5),
+])
+def test_coercion(name, value, expected):
+    assert validate({**VALID, name: value})[name] == expected
+
+
+@pytest.mark.parametrize("name, value", [
+    ("count", "seven"),
+    ("count", 7.5),
+    ("count", True),
+    ("limit", False),
+    ("ratio", True),
+    ("enabled", "maybe"),
+    ("tags", "not json"),
+    ("tags", [["nested"]]),
+    ("point", {"x": 1, "z": 2}),
+    ("mode", "medium"),
+])
+def test_rejection(name, value):
+    with pytest.raises(ValueError, match=name):
+        validate({**VALID, name: value})
+
+
+def test_missing_and_unexpected_arguments():
+    with pytest.raises(ValueError, match="missing required argument 'count'"):
+        validate({key: value for key, value in VALID.items() if key != "count"})
+    with pytest.raises(ValueError, match="unexpected argument"):
+        validate({**VALID, "extra": 1})
+    with pytest.raises(ValueError, match="JSON object"):
+        validate(["not", "a", "dict"])
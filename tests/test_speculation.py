@@ -0,0 +1,36 @@
+from src.tool_agent.speculation import predict_json
+
+
+def test_complete_object_is_parsed_despite_trailing_text():
+    assert predict_json(' {"name": "a", "arguments": {}} </tool_call>') == {"name": "a", "arguments": {}}
+
+
+def test_closes_at_last_finished_string():
+    assert predict_json('{"name": "a", "arguments": {"x": "ab"') == {"name": "a", "arguments": {"x": "ab"}}
+
+
+def test_closes_at_last_finished_container():
+    assert predict_json('{"name": "a", "arguments": {"x": [1, 2]') == {"name": "a", "arguments": {"x": [1, 2]}}
+
+
+def test_not_predicted_while_a_value_may_still_grow():
+    assert predict_json('{"name": "a", "arguments": {"x": 1') is None
+    assert predict_json('{"name": "a", "arguments": {"x": tru') is None
+    assert predict_json('{"name": "a", "arguments": {"x": "a') is None
+
+
+def test_not_predicted_after_a_dangling_key_or_separator():
+    assert predict_json('{"name": "a",') is None
+    assert predict_json('{"name":') is None
+    assert predict_json('{"name": "a", "arguments"') is None
+
+
+def test_escaped_quotes_do_not_end_a_string():
+    assert predict_json('{"name": "a", "arguments": {"x": "say \\"hi') is None
+    assert predict_json('{"name": "a", "arguments": {"x": "say \\"hi\\""') == {"name": "a", "arguments": {"x": 'say "hi"'}}
+
+
+def test_non_objects_are_not_predicted():
+    assert predict_json("") is None
+    assert predict_json('["a", "b"]') is None
+    assert predict_json("call the add tool") is None
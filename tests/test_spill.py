@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from src.tool_agent.spill import DiskSpillStore, MmapSpillStore, ObservationSpiller
+from src.tool_agent.tool import tool
+
+
+@pytest.fixture(params=["disk", "mmap"])
+def store(request, tmp_path):
+    store = DiskSpillStore(str(tmp_path / "obs")) if request.param == "disk" else MmapSpillStore(str(tmp_path / "obs.bin"))
+    yield store
+    store.close()
+
+
+@tool
+def dump() -> str:
+    """Returns a long text."""
+    return "x" * 100
+
+
+@tool(max_observation_chars=1000)
+def roomy() -> str:
+    """Returns a long text with a larger cap."""
+    return "y" * 100
+
+
+def test_reads_byte_ranges(store):
+    handle = store.put("hello world")
+    assert store.size(handle) == 11
+    assert store.read(handle) == "hello world"
+    assert store.read(handle, 6) == "world"
+    assert store.read(handle, 0, 5) == "hello"
+    assert store.read(handle, 6, 100) == "world"
+    assert store.read(handle, 100) == ""
+
+
+def test_same_content_is_stored_once(store):
+    first = store.put("same")
+    assert store.put("same") == first
+    assert store.put("other") != first
+
+
+def test_range_cutting_a_character_is_dropped(store):
+    handle = store.put("é!")
+    assert store.size(handle) == 3
+    assert store.read(handle, 1) == "!"
+
+
+def test_unknown_handle_raises_key_error(store):
+    store.put("something")
+    with pytest.raises(KeyError):
+        store.size("obs-0000000000000000")
+    with pytest.raises(KeyError):
+        store.read("obs-0000000000000000")
+    with pytest.raises(KeyError):
+        store.read("../../etc/passwd")
+
+
+def test_mmap_store_reopens_with_its_observations(tmp_path):
+    path = str(tmp_path / "obs.bin")
+    store = MmapSpillStore(path)
+    first, second = store.put("first"), store.put("second")
+    store.close()
+
+    reopened = MmapSpillStore(path)
+    assert reopened.read(first) == "first"
+    assert reopened.read(second) == "second"
+    reopened.close()
+    assert os.path.exists(path)
+
+
+def test_mmap_store_drops_a_torn_record(tmp_path):
+    path = str(tmp_path / "obs.bin")
+    store = MmapSpillStore(path)
+    kept = store.put("kept")
+    store.close()
+    intact = os.path.getsize(path)
+    with open(path, "ab") as file:
+        file.write(b"\x00" * 10)
+
+    reopened = MmapSpillStore(path)
+    assert reopened.read(kept) == "kept"
+    assert os.path.getsize(path) == intact
+    added = reopened.put("added")
+    reopened.close()
+    assert MmapSpillStore(path).read(added) == "added"
+
+
+def test_owned_storage_is_removed_on_close():
+    disk, mapped = DiskSpillStore(), MmapSpillStore()
+    disk.put("a")
+    mapped.put("a")
+    disk.close()
+    mapped.close()
+    assert not os.path.exists(disk.directory)
+    assert not os.path.exists(mapped.path)
+
+
+def test_spiller_previews_and_reads_back(tmp_path):
+    spiller = ObservationSpiller(DiskSpillStore(str(tmp_path)), max_chars=40, preview_chars=10)
+    rendered = asyncio.run(spiller.arender(dump, "x" * 100))
+    assert rendered.startswith("x" * 10 + "\n[truncated: bytes 0-10 of 100 shown")
+    handle = rendered.split("stored as '")[1].split("'")[0]
+
+    more = spiller.read_tool.run(handle=handle, offset=10, length=20)
+    assert more.startswith("x" * 20 + "\n[bytes 10-30 of 100")
+    assert spiller.read_tool.run(handle=handle, offset=90) == "x" * 10
+    assert spiller.read_tool.run(handle="obs-0000000000000000").startswith("Error")
+
+
+def test_spiller_keeps_results_under_their_cap(tmp_path):
+    spiller = ObservationSpiller(DiskSpillStore(str(tmp_path)), max_chars=40)
+    assert asyncio.run(spiller.arender(dump, "short")) == "short"
+    assert asyncio.run(spiller.arender(roomy, "y" * 100)) == "y" * 100
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from src.tool_agent.memo import ToolMemo, make_memo_key
+from src.tool_agent.tool import tool
+
+runs = []
+
+
+@tool(cache="pure")
+async def lookup(city: str) -> str:
+    """Looks a city up slowly."""
+    runs.append(city)
+    await asyncio.sleep(0.05)
+    if city == "nowhere":
+        raise LookupError(city)
+    return city.upper()
+
+
+@tool
+async def fresh(city: str) -> str:
+    """Never memoized."""
+    runs.append(city)
+    return city
+
+
+@pytest.fixture(autouse=True)
+def clear_runs():
+    runs.clear()
+
+
+def call(memo: ToolMemo, t, city: str):
+    arguments = t.validate({"city": city})
+    return memo.arun(t, arguments, lambda: t.fn(**arguments))
+
+
+def test_identical_calls_in_flight_share_one_run():
+    memo = ToolMemo()
+
+    async def scenario():
+        return await asyncio.gather(*(call(memo, lookup, "paris") for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert runs == ["paris"]
+    assert [result for result, _ in results] == ["PARIS"] * 5
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
+    assert (memo.stats.hits, memo.stats.misses) == (4, 1)
+
+
+def test_finished_results_are_reused():
+    memo = ToolMemo()
+    assert asyncio.run(call(memo, lookup, "rome")) == ("ROME", False)
+    assert asyncio.run(call(memo, lookup, "rome")) == ("ROME", True)
+    assert runs == ["rome"]
+
+
+def test_failures_are_shared_but_not_stored():
+    memo = ToolMemo()
+
+    async def scenario():
+        return await asyncio.gather(*(call(memo, lookup, "nowhere") for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(error, LookupError) for error in asyncio.run(scenario()))
+    assert runs == ["nowhere"]
+    with pytest.raises(LookupError):
+        asyncio.run(call(memo, lookup, "nowhere"))
+    assert runs == ["nowhere", "nowhere"]
+
+
+def test_waiter_reruns_when_the_shared_call_is_cancelled():
+    memo = ToolMemo()
+
+    async def scenario():
+        first = asyncio.ensure_future(call(memo, lookup, "oslo"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(call(memo, lookup, "oslo"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == ("OSLO", False)
+    assert runs == ["oslo", "oslo"]
+
+
+def test_never_policy_always_runs():
+    memo = ToolMemo()
+    for _ in range(2):
+        asyncio.run(call(memo, fresh, "x"))
+    assert runs == ["x", "x"]
+    assert len(memo) == 0
+
+
+def test_memo_key_ignores_argument_order():
+    assert make_memo_key("t", {"a": 1, "b": 2}) == make_memo_key("t", {"b": 2, "a": 1})
+    assert make_memo_key("t", {"a": 1}) != make_memo_key("t", {"a": 2})
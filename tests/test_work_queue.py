@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from src.multiagent_systen.agent import Agent
+from src.multiagent_systen.crew import Crew
+from src.multiagent_systen.work_queue import WorkQueue, agent_from_payload, agent_payload
+from src.utils.cache import MemoryCache, SQLiteCache
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+
+def test_tasks_are_claimed_once_in_order(queue):
+    first = queue.put("crew", {"n": 1})
+    second = queue.put("crew", {"n": 2})
+
+    assert queue.claim("w1") == (first, {"n": 1})
+    assert queue.claim("w2") == (second, {"n": 2})
+    assert queue.claim("w3") is None
+    assert queue.state(first)[0] == "running"
+
+
+def test_concurrent_claims_never_share_a_task(queue):
+    ids = {queue.put("crew", {"n": n}) for n in range(50)}
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        other = WorkQueue(queue.path)
+        while (task := other.claim(name)) is not None:
+            with lock:
+                claimed.append(task[0])
+        other.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{n}",)) for n in range(4)]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_expired_lease_hands_the_task_out_again(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease=0.01)
+    task_id = queue.put("crew", {"n": 1})
+    assert queue.claim("killed worker")[0] == task_id
+    time.sleep(0.02)
+    assert queue.claim("next worker")[0] == task_id
+    queue.close()
+
+
+def test_live_lease_is_not_reclaimed(queue):
+    queue.put("crew", {"n": 1})
+    queue.claim("w1")
+    assert queue.claim("w2") is None
+
+
+def test_results_failures_and_deletion(queue):
+    done, failed = queue.put("crew", {}), queue.put("crew", {})
+    queue.complete(done, "output")
+    queue.fail(failed, "boom")
+
+    assert queue.state(done) == ("done", "output", None)
+    assert queue.state(failed) == ("failed", None, "boom")
+    queue.delete(done)
+    with pytest.raises(KeyError):
+        queue.state(done)
+
+
+def test_agent_payload_round_trip(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_size=10)
+    with Crew():
+        agent = Agent("a", "backstory", "task", cache=cache, max_history_tokens=900, max_observation_chars=300)
+        agent.context = "upstream output"
+        rebuilt = agent_from_payload(agent_payload(agent))
+
+    assert (rebuilt.name, rebuilt.context) == ("a", "upstream output")
+    assert (rebuilt.max_history_tokens, rebuilt.max_observation_chars) == (900, 300)
+    assert isinstance(rebuilt.cache, SQLiteCache) and rebuilt.cache.max_size == 10
+
+
+def test_agent_payload_rejects_unshareable_cache():
+    with Crew():
+        agent = Agent("a", "backstory", "task", cache=MemoryCache())
+    with pytest.raises(ValueError, match="MemoryCache"):
+        agent_payload(agent)